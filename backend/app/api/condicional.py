@@ -0,0 +1,43 @@
+import hashlib
+from typing import Any, Callable
+from fastapi import Depends, HTTPException, Request, Response, status
+from sqlalchemy.orm import Session
+from app.api.respuestas import cache_respuestas
+from app.core.config import RESPONSE_CACHE_URL, RESPONSE_CACHE_SINGLE_PROCESS
+from app.db.session import get_sesion_lectura, ejecuta
+from app.db.versiones import lee_versiones
+
+
+def _coincide(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # comparacion debil: W/"x" y "x" son el mismo
+    opaco = etag.removeprefix("W/")
+    return any(valor.strip().removeprefix("W/") == opaco for valor in if_none_match.split(","))
+
+
+# dependencia de las rutas de lectura: el ETag sale de las versiones de las tablas que arman la respuesta.
+# Si el cliente ya tiene esa version (If-None-Match) se responde 304 antes de correr la consulta y serializar.
+# Va despues de revisa_usuario en la firma, para no responder 304 sin autenticar
+def condicional(*tablas: str, sesion: Callable[..., Any] = get_sesion_lectura) -> Callable[..., Any]:
+
+    async def dependencia(request: Request, response: Response, db: Session = Depends(sesion)) -> None:
+        # el NDJSON es otra representacion y sale sin ETag
+        if "application/x-ndjson" in request.headers.get("accept", ""):
+            return
+        # las versiones salen del cache cuando todos los commits lo invalidan: con Redis, o en memoria si este
+        # es el unico proceso que escribe (asi una lectura repetida no toca la BD). Con varios workers y cache
+        # en memoria, un commit de otro proceso no lo invalida: se leen de la BD (una busqueda por llave primaria)
+        if RESPONSE_CACHE_URL or RESPONSE_CACHE_SINGLE_PROCESS:
+            versiones = await cache_respuestas.obtiene(("versiones", tablas), tablas, lambda: ejecuta(db, lee_versiones, tablas))
+        else:
+            versiones = await ejecuta(db, lee_versiones, tablas)
+        firma = ";".join(f"{tabla}={version}" for tabla, version in versiones.items())
+        etag = f'W/"{hashlib.sha1(firma.encode()).hexdigest()[:20]}"'
+
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and _coincide(if_none_match, etag):
+            raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+        response.headers["ETag"] = etag
+
+    return dependencia
@@ -0,0 +1,36 @@
+from typing import Any, Callable
+from fastapi import Request
+from app.core.config import RATE_LIMIT_STORAGE_URL, RATE_LIMIT_DEFAULT, RATE_LIMIT_API_PER_MIN, RATE_LIMIT_BURST
+from app.core.limites import Limitador, Limite, crea_backend_limites
+from app.services.auth import AuthService
+
+# un solo limitador para toda la app (middleware y limites por ruta), con el estado en RATE_LIMIT_STORAGE_URL
+limitador = Limitador(crea_backend_limites(RATE_LIMIT_STORAGE_URL))
+
+# toda peticion pasa por los tres: sostenido por hora y por minuto, y rafaga por segundo
+LIMITES_GLOBALES = [
+    Limite.desde_texto("default", RATE_LIMIT_DEFAULT),
+    Limite.desde_texto("api", RATE_LIMIT_API_PER_MIN),
+    Limite.desde_texto("rafaga", RATE_LIMIT_BURST),
+]
+
+def clave_ip(request: Request) -> str:
+    return f"ip:{request.client.host if request.client else '127.0.0.1'}"
+
+# con un token valido la clave es el usuario (sub del JWT), aunque cambie de IP; si no, la IP
+def clave_usuario(request: Request) -> str:
+    esquema, _, token = request.headers.get("authorization", "").partition(" ")
+    if esquema.lower() == "bearer" and token:
+        token_data = AuthService.decodifica_token(token)
+        if token_data is not None:
+            return f"usuario:{token_data.username}"
+    return clave_ip(request)
+
+# limite extra para una ruta, como dependencia (ej. /auth/token por IP)
+def limita(nombre: str, texto: str, clave: Callable[[Request], str] = clave_ip) -> Callable[..., Any]:
+    limite = Limite.desde_texto(nombre, texto)
+
+    async def dependencia(request: Request) -> None:
+        await limitador.consume_async(clave(request), [limite])
+
+    return dependencia
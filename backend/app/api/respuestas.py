@@ -0,0 +1,44 @@
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Hashable, Iterable, Mapping, Optional, Tuple
+from fastapi import Response
+from pydantic import TypeAdapter
+from app.core.cache import BackendMemoria, BackendRedis, CacheEtiquetado
+from app.core.config import RESPONSE_CACHE_URL, RESPONSE_CACHE_TTL_SECONDS, RESPONSE_CACHE_MAXSIZE
+from app.db.versiones import al_confirmar
+
+
+@lru_cache(maxsize=None)
+def _adaptador(tipo: Any) -> TypeAdapter:
+    return TypeAdapter(tipo)
+
+# datos que el servicio ya valido: pydantic los pasa a JSON (bytes) una sola vez, sin volver por
+# el response_model. Solo hace falta cuando el response_model es una Union (ej. List[Cliente] | List[ClienteResumen]):
+# con un tipo unico FastAPI ya acepta las instancias sin revalidar y serializa igual
+def respuesta_json(tipo: Any, datos: Any, headers: Optional[Mapping[str, str]] = None) -> Response:
+    return Response(content=_adaptador(tipo).dump_json(datos), media_type="application/json", headers=dict(headers or {}))
+
+
+# cache de respuestas de las lecturas del catalogo; cada commit invalida las etiquetas de las tablas que escribio.
+# En memoria la invalidacion es del proceso (con varios workers lo demas vence por TTL); con Redis es compartida
+cache_respuestas = CacheEtiquetado(
+    BackendRedis.desde_url(RESPONSE_CACHE_URL) if RESPONSE_CACHE_URL
+    else BackendMemoria(maxsize=RESPONSE_CACHE_MAXSIZE, ttl=RESPONSE_CACHE_TTL_SECONDS),
+    ttl=RESPONSE_CACHE_TTL_SECONDS,
+)
+al_confirmar(cache_respuestas.invalida)
+
+# la consulta devuelve (datos, headers); se guarda el JSON ya serializado, asi un acierto no toca la BD ni pydantic.
+# Los headers de la respuesta inyectada (ej. ETag) se agregan en cada peticion. El ETag (versiones leidas de la BD)
+# va en la clave: un commit de otro worker cambia la version y la entrada vieja de este proceso ya no se usa
+async def respuesta_cacheada(
+    response: Response, clave: Tuple[Hashable, ...], tablas: Iterable[str], tipo: Any,
+    consulta: Callable[[], Awaitable[Tuple[Any, Mapping[str, str]]]]
+) -> Response:
+    async def genera() -> Tuple[bytes, dict]:
+        datos, headers = await consulta()
+        adaptador = _adaptador(tipo)
+        return adaptador.dump_json(adaptador.validate_python(datos, from_attributes=True)), dict(headers)
+
+    cuerpo, headers = await cache_respuestas.obtiene((*clave, response.headers.get("etag")), tablas, genera)
+    headers = {**headers, **{k: v for k, v in response.headers.items() if k != "content-length"}}
+    return Response(content=cuerpo, media_type="application/json", headers=headers)
@@ -1,71 +1,120 @@
-from fastapi import APIRouter, Response, Query, status, Depends
+from fastapi import APIRouter, Request, Response, Query, status, Depends
+from fastapi.responses import StreamingResponse
 from typing import List, Literal, Dict
 from sqlalchemy.orm import Session
-from app.db.session import get_db
+from app.db.session import get_sesion, get_sesion_lectura, ejecuta, sesion_stream
+from app.api.respuestas import respuesta_cacheada
 from app.models import schemas
 from app.services.articulos import ArticuloService
 from app.services.auth import AuthService
+from app.api.condicional import condicional
+from app.services.bulk import formato_bulk, pide_stream, respuesta_ndjson
+from app.core.config import TODOS_PAGE_SIZE, TODOS_PAGE_SIZE_MAX
 
 router = APIRouter(prefix="/articulos", tags=["articulos"])
 
 @router.post("/", response_model=schemas.Articulo, status_code=status.HTTP_201_CREATED)
-def crear_articulo(
+async def crear_articulo(
     payload: schemas.ArticuloCreate, 
-    db: Session = Depends(get_db), current_user: schemas.User = Depends(AuthService.revisa_usuario)
+    db: Session = Depends(get_sesion), current_user: schemas.User = Depends(AuthService.revisa_usuario)
 ) -> schemas.Articulo:
-    return ArticuloService.crea_articulo(db, payload)
+    return await ejecuta(db, ArticuloService.crea_articulo, payload)
 
 @router.get("/todos/", response_model=List[schemas.Articulo])
-def listar_todos(db: Session = Depends(get_db), current_user: schemas.User = Depends(AuthService.revisa_usuario)) -> List[schemas.Articulo]:
-    return ArticuloService.lista_todos(db)
+async def listar_todos(
+    response: Response,
+    request: Request,
+    stream: bool = Query(False, description="Todos los registros en NDJSON, sin paginar (o Accept: application/x-ndjson)"),
+    cursor: str | None = Query(None, description="Cursor de la siguiente página (header X-Next-Cursor)"),
+    limit: int = Query(TODOS_PAGE_SIZE, ge=1, le=TODOS_PAGE_SIZE_MAX, description="Cantidad de resultados por página"),
+    db: Session = Depends(get_sesion_lectura), current_user: schemas.User = Depends(AuthService.revisa_usuario), etag: None = Depends(condicional("articulos"))
+) -> List[schemas.Articulo]:
+    if pide_stream(request, stream):
+        return respuesta_ndjson(ArticuloService.stream_todos)
+
+    async def consulta():
+        results, next_cursor = await ejecuta(db, ArticuloService.lista_todos, limit, cursor)
+        return results, {"X-Next-Cursor": next_cursor} if next_cursor else {}
+    return await respuesta_cacheada(response, ("articulos/todos", limit, cursor), ["articulos"], List[schemas.Articulo], consulta)
+
+@router.post("/bulk", response_model=schemas.ImportacionArticulos)
+async def importar_articulos(
+    request: Request,
+    db: Session = Depends(get_sesion), current_user: schemas.User = Depends(AuthService.revisa_usuario)
+) -> schemas.ImportacionArticulos:
+    # CSV (con encabezado id,nombre,descripcion,precio,existencia) o NDJSON, segun el Content-Type
+    formato = formato_bulk(request.headers.get("content-type"))
+    return await ArticuloService.importa_articulos(db, request.stream(), formato)
+
+@router.get("/bulk")
+async def exportar_articulos(
+    formato: str = Query("ndjson", regex="^(csv|ndjson)$", description="Formato de salida: csv | ndjson"),
+    current_user: schemas.User = Depends(AuthService.revisa_usuario)
+) -> StreamingResponse:
+    media_type = "text/csv" if formato == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        sesion_stream(ArticuloService.exporta, formato),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="articulos.{formato}"'}
+    )
 
 @router.get("/{id_articulo}", response_model=schemas.Articulo)
-def buscar_id(
+async def buscar_id(
+    response: Response,
     id_articulo: int, 
-    db: Session = Depends(get_db), current_user: schemas.User = Depends(AuthService.revisa_usuario)
+    db: Session = Depends(get_sesion), current_user: schemas.User = Depends(AuthService.revisa_usuario), etag: None = Depends(condicional("articulos", sesion=get_sesion))
 ) -> schemas.Articulo:
-    return ArticuloService.busca_id(db, id_articulo)
+    async def consulta():
+        return await ejecuta(db, ArticuloService.busca_id, id_articulo), {}
+    return await respuesta_cacheada(response, ("articulos/id", id_articulo), ["articulos"], schemas.Articulo, consulta)
 
 @router.get("/", response_model=List[schemas.Articulo])
-def buscar_articulos(
+async def buscar_articulos(
     response: Response,
     q: str | None = Query(None, description="Palabra clave a buscar del ARTICULO"),
-    sort: str = Query("nombre", regex="^(nombre|descripcion)$", description="Ordenar por: nombre | descripcion"),
+    sort: str = Query("nombre", regex="^(nombre|descripcion|relevancia)$", description="Ordenar por: nombre | descripcion | relevancia"),
     order: str = Query("asc", regex="^(asc|desc)$", description="Forma de ordenar: asc | desc"),
     offset: int = Query(0, ge=0, description="Inicio de los resultados"),
     limit: int = Query(10, ge=1, le=100, description="Cantidad de resultados por página"),
-    db: Session = Depends(get_db), current_user: schemas.User = Depends(AuthService.revisa_usuario)
+    cursor: str | None = Query(None, description="Cursor de la siguiente página (reemplaza offset)"),
+    db: Session = Depends(get_sesion_lectura), current_user: schemas.User = Depends(AuthService.revisa_usuario), etag: None = Depends(condicional("articulos"))
 ) -> List[schemas.Articulo]:
-    results, total = ArticuloService.busca_articulos(db, q, sort, order, offset, limit)
-    response.headers["X-Total-Articulos"] = str(total)
+    results, total, next_cursor = await ejecuta(db, ArticuloService.busca_articulos, q, sort, order, offset, limit, cursor)
+    if total is not None:
+        response.headers["X-Total-Articulos"] = str(total)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return results
 
 @router.get("/existencia/{disponibilidad}", response_model=List[schemas.Articulo])
-def listar_por_existencia(
+async def listar_por_existencia(
+    response: Response,
     disponibilidad: Literal["disponible", "no disponible"],
-    db: Session = Depends(get_db), current_user: schemas.User = Depends(AuthService.revisa_usuario)
+    db: Session = Depends(get_sesion_lectura), current_user: schemas.User = Depends(AuthService.revisa_usuario), etag: None = Depends(condicional("articulos"))
 ) -> List[schemas.Articulo]:
-    return ArticuloService.lista_por_existencia(db, disponibilidad)
+    async def consulta():
+        return await ejecuta(db, ArticuloService.lista_por_existencia, disponibilidad), {}
+    return await respuesta_cacheada(response, ("articulos/existencia", disponibilidad), ["articulos"], List[schemas.Articulo], consulta)
 
 @router.get("/{id_articulo}/ventas/", response_model=List[Dict])
-def listar_ventas(
+async def listar_ventas(
     id_articulo: int, 
-    db: Session = Depends(get_db), current_user: schemas.User = Depends(AuthService.revisa_usuario)
+    db: Session = Depends(get_sesion_lectura), current_user: schemas.User = Depends(AuthService.revisa_usuario)
 ) -> List[Dict]:
-    return ArticuloService.lista_ventas(db, id_articulo)
+    return await ejecuta(db, ArticuloService.lista_ventas, id_articulo)
 
 @router.put("/{id_articulo}", response_model=schemas.Articulo)
-def actualizar_articulo(
+async def actualizar_articulo(
     id_articulo: int, 
     articulo_data: schemas.ArticuloUpdate, 
-    db: Session = Depends(get_db), current_user: schemas.User = Depends(AuthService.revisa_usuario)
+    db: Session = Depends(get_sesion), current_user: schemas.User = Depends(AuthService.revisa_usuario)
 ) -> schemas.Articulo:
-    return ArticuloService.actualiza_articulo(db, id_articulo, articulo_data)
+    return await ejecuta(db, ArticuloService.actualiza_articulo, id_articulo, articulo_data)
 
 @router.delete("/{id_articulo}", status_code=status.HTTP_204_NO_CONTENT)
-def eliminar_articulo(
+async def eliminar_articulo(
     id_articulo: int, 
-    db: Session = Depends(get_db), current_user: schemas.User = Depends(AuthService.revisa_usuario)
+    db: Session = Depends(get_sesion), current_user: schemas.User = Depends(AuthService.revisa_usuario)
 ) -> Response:
-    ArticuloService.elimina_articulo(db, id_articulo)
+    await ejecuta(db, ArticuloService.elimina_articulo, id_articulo)
     return Response(status_code=status.HTTP_204_NO_CONTENT)
\ No newline at end of file
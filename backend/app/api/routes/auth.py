@@ -2,25 +2,22 @@ from fastapi import APIRouter, Depends, HTTPException, status, Request
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from datetime import timedelta
-from slowapi import Limiter
-from slowapi.util import get_remote_address
 
-from app.db.session import get_db
+from app.db.session import get_sesion, ejecuta
 from app.models import schemas, models
 from app.services.auth import AuthService
 from app.core.config import ACCESS_TOKEN_EXPIRE_MINUTES, RATE_LIMIT_AUTH_PER_MIN
+from app.api.limites import limita
 
-limiter = Limiter(key_func=get_remote_address)
 router = APIRouter(prefix="/auth", tags=["auth"])
 
-@router.post("/token", response_model=schemas.Token)
-@limiter.limit(RATE_LIMIT_AUTH_PER_MIN)
+@router.post("/token", response_model=schemas.Token, dependencies=[Depends(limita("auth", RATE_LIMIT_AUTH_PER_MIN))])
 async def autenticar(
     request: Request,
     form_data: OAuth2PasswordRequestForm = Depends(), 
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_sesion)
 ):
-    user = AuthService.autentica(db, form_data.username, form_data.password)
+    user = await AuthService.autentica_async(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -35,14 +32,27 @@ async def autenticar(
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.post("/register", response_model=schemas.User, status_code=status.HTTP_201_CREATED)
-def register(
+async def register(
     user: schemas.UserCreate,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_sesion)
 ):
-    return AuthService.regist(db, user)
+    return await AuthService.regist_async(db, user)
 
 @router.get("/users/me", response_model=schemas.User)
-def me(
+async def me(
     current_user: models.User = Depends(AuthService.revisa_usuario)
 ):
-    return current_user
\ No newline at end of file
+    return current_user
+
+@router.get("/cache/estadisticas")
+async def estadisticas_cache(
+    current_user: models.User = Depends(AuthService.revisa_usuario)
+):
+    return AuthService.estadisticas_cache()
+
+
+@router.get("/hash/estadisticas")
+async def estadisticas_hash(
+    current_user: models.User = Depends(AuthService.revisa_usuario)
+):
+    return AuthService.estadisticas_hash()
@@ -1,44 +1,66 @@
-from fastapi import APIRouter, status, Response, Query, Depends
+from fastapi import APIRouter, Request, status, Response, Query, Depends
 from typing import List
 from app.models.schemas import Cliente, ClienteCreate, ClienteUpdate
 from app.services.clientes import ClienteService
 from app.models import schemas
 from sqlalchemy.orm import Session
-from app.db.session import get_db
+from app.api.respuestas import respuesta_json
+from app.db.session import get_sesion, get_sesion_lectura, ejecuta
 from app.services.auth import AuthService
+from app.api.condicional import condicional
+from app.services.bulk import pide_stream, respuesta_ndjson
+from app.core.config import TODOS_PAGE_SIZE, TODOS_PAGE_SIZE_MAX
 
 router = APIRouter(prefix="/clientes", tags=["clientes"])
 
 @router.post("/", response_model=Cliente, status_code=201)
-def crear_clientes(payload: ClienteCreate, db: Session = Depends(get_db), current_user: schemas.User = Depends(AuthService.revisa_usuario)):
-    return ClienteService.crea_clientes(db, payload)
+async def crear_clientes(payload: ClienteCreate, db: Session = Depends(get_sesion), current_user: schemas.User = Depends(AuthService.revisa_usuario)):
+    return await ejecuta(db, ClienteService.crea_clientes, payload)
 
-@router.get("/todos/", response_model=List[schemas.Cliente])
-def listar_todos(db: Session = Depends(get_db), current_user: schemas.User = Depends(AuthService.revisa_usuario)) -> List[schemas.Cliente]:
-    return ClienteService.lista_todos(db)
+@router.get("/todos/", response_model=List[schemas.Cliente] | List[schemas.ClienteResumen])
+async def listar_todos(
+    response: Response,
+    request: Request,
+    stream: bool = Query(False, description="Todos los registros en NDJSON, sin paginar (o Accept: application/x-ndjson)"),
+    include: str | None = Query(None, regex="^ordenes$", description="Incluir las ordenes de cada cliente: ordenes"),
+    cursor: str | None = Query(None, description="Cursor de la siguiente página (header X-Next-Cursor)"),
+    limit: int = Query(TODOS_PAGE_SIZE, ge=1, le=TODOS_PAGE_SIZE_MAX, description="Cantidad de resultados por página"),
+    db: Session = Depends(get_sesion_lectura), current_user: schemas.User = Depends(AuthService.revisa_usuario)
+) -> List[schemas.Cliente] | List[schemas.ClienteResumen]:
+    if pide_stream(request, stream):
+        return respuesta_ndjson(ClienteService.stream_todos, include == "ordenes")
+    results, next_cursor = await ejecuta(db, ClienteService.lista_todos, limit, cursor, include == "ordenes")
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return respuesta_json(List[schemas.Cliente] if include == "ordenes" else List[schemas.ClienteResumen], results, response.headers)
 
 @router.get("/{cliente_id}", response_model=schemas.Cliente)
-def buscar_id(cliente_id: int, db: Session = Depends(get_db), current_user: schemas.User = Depends(AuthService.revisa_usuario)) -> schemas.Cliente:
-    return ClienteService.busca_id(db, cliente_id)
+async def buscar_id(cliente_id: int, db: Session = Depends(get_sesion), current_user: schemas.User = Depends(AuthService.revisa_usuario), etag: None = Depends(condicional("clientes", "ordenes", "mantenimientos", "ventas", sesion=get_sesion))) -> schemas.Cliente:
+    return await ejecuta(db, ClienteService.busca_id, cliente_id)
 
-@router.get("/", response_model=List[schemas.Cliente])
-def buscar_clientes(
+@router.get("/", response_model=List[schemas.Cliente] | List[schemas.ClienteResumen])
+async def buscar_clientes(
     response: Response,
-    db: Session = Depends(get_db), current_user: schemas.User = Depends(AuthService.revisa_usuario),
+    db: Session = Depends(get_sesion_lectura), current_user: schemas.User = Depends(AuthService.revisa_usuario),
     q: int | str | None = Query(None, description="Palabra clave a buscar del CLIENTE"),
-    sort: str = Query("nombre", regex="^(nombre|apellido|correo)$", description="Ordenar por: nombre | apellido | correo"),
+    sort: str = Query("nombre", regex="^(nombre|apellido|correo|relevancia)$", description="Ordenar por: nombre | apellido | correo | relevancia"),
     order: str = Query("asc", regex="^(asc|desc)$", description="Forma de ordenar: asc | desc"),
     offset: int = Query(0, ge=0, description="Inicio de los resultados"),
     limit: int = Query(10, ge=1, le=100, description="Número máximo de resultados a retornar"),
-) -> List[schemas.Cliente]:
-    results, total = ClienteService.busca_clientes(db, q, sort, order, offset, limit)
-    response.headers["X-Total-Clientes"] = str(total)
-    return results
+    cursor: str | None = Query(None, description="Cursor de la siguiente página (reemplaza offset)"),
+    include: str | None = Query(None, regex="^ordenes$", description="Incluir las ordenes de cada cliente: ordenes"),
+) -> List[schemas.Cliente] | List[schemas.ClienteResumen]:
+    results, total, next_cursor = await ejecuta(db, ClienteService.busca_clientes, q, sort, order, offset, limit, cursor, include == "ordenes")
+    if total is not None:
+        response.headers["X-Total-Clientes"] = str(total)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return respuesta_json(List[schemas.Cliente] if include == "ordenes" else List[schemas.ClienteResumen], results, response.headers)
 
 @router.put("/{cliente_id}", response_model=Cliente, status_code=200)
-def actualizar_clientes(cliente_id: int, payload: ClienteUpdate, db: Session = Depends(get_db), current_user: schemas.User = Depends(AuthService.revisa_usuario)):
-    return ClienteService.actualiza_clientes(db, cliente_id, payload)
+async def actualizar_clientes(cliente_id: int, payload: ClienteUpdate, db: Session = Depends(get_sesion), current_user: schemas.User = Depends(AuthService.revisa_usuario)):
+    return await ejecuta(db, ClienteService.actualiza_clientes, cliente_id, payload)
 
 @router.delete("/{cliente_id}", response_model=None, status_code=204)
-def eliminar_clientes(cliente_id: int, db: Session = Depends(get_db), current_user: schemas.User = Depends(AuthService.revisa_usuario)):
-    return ClienteService.elimina_clientes(db, cliente_id)
\ No newline at end of file
+async def eliminar_clientes(cliente_id: int, db: Session = Depends(get_sesion), current_user: schemas.User = Depends(AuthService.revisa_usuario)):
+    return await ejecuta(db, ClienteService.elimina_clientes, cliente_id)
\ No newline at end of file
@@ -0,0 +1,13 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+from app.db.session import get_sesion_lectura, ejecuta
+from app.models import schemas
+from app.services.dashboard import DashboardService
+from app.services.auth import AuthService
+
+router = APIRouter(prefix="/dashboard", tags=["dashboard"])
+
+# lee los contadores ya calculados: no recorre las tablas en cada peticion
+@router.get("/metricas", response_model=schemas.DashboardMetricas)
+async def metricas(db: Session = Depends(get_sesion_lectura), current_user: schemas.User = Depends(AuthService.revisa_usuario)) -> schemas.DashboardMetricas:
+    return await ejecuta(db, DashboardService.metricas)
@@ -1,50 +1,85 @@
-from fastapi import APIRouter, status, Response, Query, Depends
+from fastapi import APIRouter, Request, status, Response, Query, Depends
 from typing import List, Literal
 from app.models.schemas import Orden, CrearOrden, UpdateOrden
 from app.services.ordenes import OrdenService
 from app.models import schemas
 from sqlalchemy.orm import Session
-from app.db.session import get_db
+from app.db.session import get_sesion, get_sesion_lectura, ejecuta
 from datetime import datetime
 from app.services.auth import AuthService
+from app.api.condicional import condicional
+from app.services.bulk import pide_stream, respuesta_ndjson
+from app.core.config import TODOS_PAGE_SIZE, TODOS_PAGE_SIZE_MAX
 
 router = APIRouter(prefix="/ordenes", tags=["ordenes"])
 
 @router.post("/", response_model=Orden, status_code=status.HTTP_201_CREATED)
-def crear_ordenes(payload: CrearOrden, db: Session = Depends(get_db), current_user: schemas.User = Depends(AuthService.revisa_usuario)):
-    return OrdenService.crea_ordenes(db, payload)
+async def crear_ordenes(payload: CrearOrden, db: Session = Depends(get_sesion), current_user: schemas.User = Depends(AuthService.revisa_usuario)):
+    return await ejecuta(db, OrdenService.crea_ordenes, payload)
 
 @router.get("/todos/", response_model=List[schemas.Orden])
-def listar_todos(db: Session = Depends(get_db), current_user: schemas.User = Depends(AuthService.revisa_usuario)) -> List[schemas.Orden]:
-    return OrdenService.lista_todos(db)
+async def listar_todos(
+    response: Response,
+    request: Request,
+    stream: bool = Query(False, description="Todos los registros en NDJSON, sin paginar (o Accept: application/x-ndjson)"),
+    cursor: str | None = Query(None, description="Cursor de la siguiente página (header X-Next-Cursor)"),
+    limit: int = Query(TODOS_PAGE_SIZE, ge=1, le=TODOS_PAGE_SIZE_MAX, description="Cantidad de resultados por página"),
+    db: Session = Depends(get_sesion_lectura), current_user: schemas.User = Depends(AuthService.revisa_usuario)
+) -> List[schemas.Orden]:
+    if pide_stream(request, stream):
+        return respuesta_ndjson(OrdenService.stream_todos)
+    results, total, next_cursor = await ejecuta(db, OrdenService.lista_todos, limit, cursor)
+    if total is not None:
+        response.headers["X-Total-Ordenes"] = str(total)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return results
 
 @router.get("/{consecutivo}", response_model=schemas.Orden)
-def buscar_consecutivo(consecutivo: int, db: Session = Depends(get_db), current_user: schemas.User = Depends(AuthService.revisa_usuario)) -> schemas.Orden:
-    return OrdenService.busca_consecutivo(db, consecutivo)
+async def buscar_consecutivo(consecutivo: int, db: Session = Depends(get_sesion), current_user: schemas.User = Depends(AuthService.revisa_usuario), etag: None = Depends(condicional("ordenes", "mantenimientos", "ventas", sesion=get_sesion))) -> schemas.Orden:
+    return await ejecuta(db, OrdenService.busca_consecutivo, consecutivo)
 
 @router.get("/tipo/{tipo_orden}", response_model=List[schemas.Orden])
-def listar_por_tipo(
+async def listar_por_tipo(
+    response: Response,
     tipo_orden: Literal["solo Ventas", "solo Mantenimientos", "Mantenimiento con ventas"],
-    db: Session = Depends(get_db), current_user: schemas.User = Depends(AuthService.revisa_usuario)
+    offset: int = Query(0, ge=0, description="Inicio de los resultados"),
+    limit: int = Query(TODOS_PAGE_SIZE, ge=1, le=TODOS_PAGE_SIZE_MAX, description="Cantidad de resultados por página"),
+    cursor: str | None = Query(None, description="Cursor de la siguiente página (reemplaza offset)"),
+    db: Session = Depends(get_sesion_lectura), current_user: schemas.User = Depends(AuthService.revisa_usuario)
 ) -> List[schemas.Orden]:
-    return OrdenService.lista_por_tipo(db, tipo_orden)
+    results, total, next_cursor = await ejecuta(db, OrdenService.lista_por_tipo, tipo_orden, offset, limit, cursor)
+    if total is not None:
+        response.headers["X-Total-Ordenes"] = str(total)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return results
 
 @router.get("/rango/fechas/", response_model=List[schemas.Orden])
-def listar_rango_fechas(
+async def listar_rango_fechas(
+    response: Response,
     fecha_inicio: datetime = Query(..., description="Digine una fecha inicial para la busqueda"),
     fecha_fin: datetime = Query(..., description="Digine una fecha final para la busqueda"),
-    db: Session = Depends(get_db), current_user: schemas.User = Depends(AuthService.revisa_usuario)
+    offset: int = Query(0, ge=0, description="Inicio de los resultados"),
+    limit: int = Query(TODOS_PAGE_SIZE, ge=1, le=TODOS_PAGE_SIZE_MAX, description="Cantidad de resultados por página"),
+    cursor: str | None = Query(None, description="Cursor de la siguiente página (reemplaza offset)"),
+    db: Session = Depends(get_sesion_lectura), current_user: schemas.User = Depends(AuthService.revisa_usuario)
 ) -> List[schemas.Orden]:
-    return OrdenService.lista_rango_fechas(db, fecha_inicio, fecha_fin)
+    results, total, next_cursor = await ejecuta(db, OrdenService.lista_rango_fechas, fecha_inicio, fecha_fin, offset, limit, cursor)
+    if total is not None:
+        response.headers["X-Total-Ordenes"] = str(total)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return results
 
 @router.get("/cliente/{cliente_id}", response_model=List[schemas.Orden])
-def listar_clientes(cliente_id: int, db: Session = Depends(get_db), current_user: schemas.User = Depends(AuthService.revisa_usuario)) -> List[schemas.Orden]:
-    return OrdenService.lista_clientes(db, cliente_id)
+async def listar_clientes(cliente_id: int, db: Session = Depends(get_sesion_lectura), current_user: schemas.User = Depends(AuthService.revisa_usuario)) -> List[schemas.Orden]:
+    return await ejecuta(db, OrdenService.lista_clientes, cliente_id)
 
 @router.put("/{consecutivo}", response_model=Orden, status_code=status.HTTP_200_OK)
-def actualizar_ordenes(consecutivo: int, payload: UpdateOrden, db: Session = Depends(get_db), current_user: schemas.User = Depends(AuthService.revisa_usuario)):
-    return OrdenService.actualiza_ordenes(db, consecutivo, payload)
+async def actualizar_ordenes(consecutivo: int, payload: UpdateOrden, db: Session = Depends(get_sesion), current_user: schemas.User = Depends(AuthService.revisa_usuario)):
+    return await ejecuta(db, OrdenService.actualiza_ordenes, consecutivo, payload)
 
 @router.delete("/{consecutivo}", response_model=None, status_code=status.HTTP_204_NO_CONTENT)
-def eliminar_ordenes(consecutivo: int, db: Session = Depends(get_db), current_user: schemas.User = Depends(AuthService.revisa_usuario)):
-    return OrdenService.elimina_ordenes(db, consecutivo)
\ No newline at end of file
+async def eliminar_ordenes(consecutivo: int, db: Session = Depends(get_sesion), current_user: schemas.User = Depends(AuthService.revisa_usuario)):
+    return await ejecuta(db, OrdenService.elimina_ordenes, consecutivo)
\ No newline at end of file
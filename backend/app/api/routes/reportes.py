@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Query, Depends
+from typing import Literal
+from sqlalchemy.orm import Session
+from app.db.session import get_sesion_lectura, ejecuta
+from app.models import schemas
+from app.services.reportes import ReporteService
+from datetime import datetime
+from app.services.auth import AuthService
+
+router = APIRouter(prefix="/reportes", tags=["reportes"])
+
+@router.get("/ventas", response_model=schemas.ReporteVentas)
+async def reporte_ventas(
+    fecha_inicio: datetime = Query(..., description="Digine una fecha inicial para el reporte"),
+    fecha_fin: datetime = Query(..., description="Digine una fecha final para el reporte"),
+    agrupacion: Literal["dia", "semana", "mes"] = Query("mes", description="Totales por: dia | semana | mes"),
+    top: int = Query(10, ge=1, le=100, description="Cantidad de articulos mas vendidos"),
+    db: Session = Depends(get_sesion_lectura), current_user: schemas.User = Depends(AuthService.revisa_usuario)
+) -> schemas.ReporteVentas:
+    return await ejecuta(db, ReporteService.ventas, fecha_inicio, fecha_fin, agrupacion, top)
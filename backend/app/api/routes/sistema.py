@@ -0,0 +1,32 @@
+from fastapi import APIRouter, Depends
+from app.api.limites import limitador
+from app.api.respuestas import cache_respuestas
+from app.db import session
+from app.db.consultas import registro_n_mas_1
+from app.db.pool import estadisticas_pool
+from app.models import schemas
+from app.services.auth import AuthService
+
+router = APIRouter(prefix="/sistema", tags=["sistema"])
+
+@router.get("/db")
+async def estadisticas_db(current_user: schemas.User = Depends(AuthService.revisa_usuario)):
+    datos = {"principal": estadisticas_pool(session.engine.pool)}
+    if session.async_engine is not None:
+        datos["principal_async"] = estadisticas_pool(session.async_engine.sync_engine.pool)
+    if session.read_engine is not None:
+        lectura = session.read_engine.sync_engine if session.ASYNC_DB else session.read_engine
+        datos["lectura"] = estadisticas_pool(lectura.pool)
+    return datos
+
+@router.get("/cache")
+async def estadisticas_cache(current_user: schemas.User = Depends(AuthService.revisa_usuario)):
+    return cache_respuestas.estadisticas()
+
+@router.get("/limites")
+async def estadisticas_limites(current_user: schemas.User = Depends(AuthService.revisa_usuario)):
+    return limitador.estadisticas()
+
+@router.get("/consultas")
+async def estadisticas_consultas(current_user: schemas.User = Depends(AuthService.revisa_usuario)):
+    return registro_n_mas_1.estadisticas()
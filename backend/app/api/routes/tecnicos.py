@@ -1,51 +1,74 @@
-from fastapi import APIRouter, Response, Query, status, Depends
+from fastapi import APIRouter, Request, Response, Query, status, Depends
 from typing import List
 from sqlalchemy.orm import Session
-from app.db.session import get_db
+from app.db.session import get_sesion, get_sesion_lectura, ejecuta
+from app.api.respuestas import respuesta_cacheada
 from app.models import schemas
 from app.services.tecnicos import TecnicoService
 from app.services.auth import AuthService
+from app.api.condicional import condicional
+from app.services.bulk import pide_stream, respuesta_ndjson
+from app.core.config import TODOS_PAGE_SIZE, TODOS_PAGE_SIZE_MAX
 
 router = APIRouter(prefix="/tecnicos", tags=["tecnicos"])
 
 @router.post("/", response_model=schemas.Tecnico, status_code=status.HTTP_201_CREATED)
-def crear_tecnico(payload: schemas.TecnicoCreate, db: Session = Depends(get_db), current_user: schemas.User = Depends(AuthService.revisa_usuario)) -> schemas.Tecnico:
-    return TecnicoService.crea_tecnico(db, payload)
+async def crear_tecnico(payload: schemas.TecnicoCreate, db: Session = Depends(get_sesion), current_user: schemas.User = Depends(AuthService.revisa_usuario)) -> schemas.Tecnico:
+    return await ejecuta(db, TecnicoService.crea_tecnico, payload)
 
 @router.get("/todos/", response_model=List[schemas.Tecnico])
-def listar_todos(db: Session = Depends(get_db), current_user: schemas.User = Depends(AuthService.revisa_usuario)) -> List[schemas.Tecnico]:
-    return TecnicoService.lista_todos(db)
+async def listar_todos(
+    response: Response,
+    request: Request,
+    stream: bool = Query(False, description="Todos los registros en NDJSON, sin paginar (o Accept: application/x-ndjson)"),
+    cursor: str | None = Query(None, description="Cursor de la siguiente página (header X-Next-Cursor)"),
+    limit: int = Query(TODOS_PAGE_SIZE, ge=1, le=TODOS_PAGE_SIZE_MAX, description="Cantidad de resultados por página"),
+    db: Session = Depends(get_sesion_lectura), current_user: schemas.User = Depends(AuthService.revisa_usuario), etag: None = Depends(condicional("tecnicos"))
+) -> List[schemas.Tecnico]:
+    if pide_stream(request, stream):
+        return respuesta_ndjson(TecnicoService.stream_todos)
+
+    async def consulta():
+        results, next_cursor = await ejecuta(db, TecnicoService.lista_todos, limit, cursor)
+        return results, {"X-Next-Cursor": next_cursor} if next_cursor else {}
+    return await respuesta_cacheada(response, ("tecnicos/todos", limit, cursor), ["tecnicos"], List[schemas.Tecnico], consulta)
 
 @router.get("/{id_tecnico}", response_model=schemas.Tecnico)
-def buscar_id(id_tecnico: int, db: Session = Depends(get_db), current_user: schemas.User = Depends(AuthService.revisa_usuario)) -> schemas.Tecnico:
-    return TecnicoService.busca_id(db, id_tecnico)
+async def buscar_id(response: Response, id_tecnico: int, db: Session = Depends(get_sesion), current_user: schemas.User = Depends(AuthService.revisa_usuario), etag: None = Depends(condicional("tecnicos", sesion=get_sesion))) -> schemas.Tecnico:
+    async def consulta():
+        return await ejecuta(db, TecnicoService.busca_id, id_tecnico), {}
+    return await respuesta_cacheada(response, ("tecnicos/id", id_tecnico), ["tecnicos"], schemas.Tecnico, consulta)
 
 @router.get("/", response_model=List[schemas.Tecnico])
-def buscar_tecnicos(
+async def buscar_tecnicos(
     response: Response,
     q: str | None = Query(None, description="Palabra clave a buscar del TECNICO"),
-    sort: str = Query("apellido", regex="^(nombre|apellido|especialidad)$", description="Ordenar por: nombre | apellido | especialidad"),
+    sort: str = Query("apellido", regex="^(nombre|apellido|especialidad|relevancia)$", description="Ordenar por: nombre | apellido | especialidad | relevancia"),
     order: str = Query("asc", regex="^(asc|desc)$", description="Forma de ordenar: asc | desc"),
     offset: int = Query(0, ge=0, description="Inicio de los resultados"),
     limit: int = Query(10, ge=1, le=100, description="Cantidad de resultados por página"),
-    db: Session = Depends(get_db), current_user: schemas.User = Depends(AuthService.revisa_usuario)
+    cursor: str | None = Query(None, description="Cursor de la siguiente página (reemplaza offset)"),
+    db: Session = Depends(get_sesion_lectura), current_user: schemas.User = Depends(AuthService.revisa_usuario), etag: None = Depends(condicional("tecnicos"))
 ) -> List[schemas.Tecnico]:
-    results, total = TecnicoService.busca_tecnicos(db, q, sort, order, offset, limit)
-    response.headers["X-Total-Tecnicos"] = str(total)
+    results, total, next_cursor = await ejecuta(db, TecnicoService.busca_tecnicos, q, sort, order, offset, limit, cursor)
+    if total is not None:
+        response.headers["X-Total-Tecnicos"] = str(total)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return results
 
 @router.get("/{id_tecnico}/mantenimientos/", response_model=List[schemas.Mantenimiento])
-def listar_mantenimientos(
+async def listar_mantenimientos(
     id_tecnico: int, 
-    db: Session = Depends(get_db), current_user: schemas.User = Depends(AuthService.revisa_usuario)
+    db: Session = Depends(get_sesion_lectura), current_user: schemas.User = Depends(AuthService.revisa_usuario)
 ) -> List[schemas.Mantenimiento]:
-    return TecnicoService.lista_mantenimientos(db, id_tecnico)
+    return await ejecuta(db, TecnicoService.lista_mantenimientos, id_tecnico)
 
 @router.put("/{id_tecnico}", response_model=schemas.Tecnico)
-def actualizar_tecnico(id_tecnico: int, tecnico_data: schemas.TecnicoUpdate, db: Session = Depends(get_db), current_user: schemas.User = Depends(AuthService.revisa_usuario)) -> schemas.Tecnico:
-    return TecnicoService.actualiza_tecnico(db, id_tecnico, tecnico_data)
+async def actualizar_tecnico(id_tecnico: int, tecnico_data: schemas.TecnicoUpdate, db: Session = Depends(get_sesion), current_user: schemas.User = Depends(AuthService.revisa_usuario)) -> schemas.Tecnico:
+    return await ejecuta(db, TecnicoService.actualiza_tecnico, id_tecnico, tecnico_data)
 
 @router.delete("/{id_tecnico}", status_code=status.HTTP_204_NO_CONTENT)
-def eliminar_tecnico(id_tecnico: int, db: Session = Depends(get_db), current_user: schemas.User = Depends(AuthService.revisa_usuario)) -> Response:
-    TecnicoService.elimina_tecnico(db, id_tecnico)
+async def eliminar_tecnico(id_tecnico: int, db: Session = Depends(get_sesion), current_user: schemas.User = Depends(AuthService.revisa_usuario)) -> Response:
+    await ejecuta(db, TecnicoService.elimina_tecnico, id_tecnico)
     return Response(status_code=status.HTTP_204_NO_CONTENT)
\ No newline at end of file
@@ -1,80 +1,99 @@
-from fastapi import APIRouter, Response, status, Depends, Query
+from fastapi import APIRouter, Request, Response, status, Depends, Query
 from typing import List, Dict
 from sqlalchemy.orm import Session
-from app.db.session import get_db
+from app.db.session import get_sesion, get_sesion_lectura, ejecuta
 from app.models import schemas
 from app.services.ventas import VentaService
 from datetime import datetime
 from app.services.auth import AuthService
+from app.api.condicional import condicional
+from app.services.bulk import pide_stream, respuesta_ndjson
+from app.core.config import TODOS_PAGE_SIZE, TODOS_PAGE_SIZE_MAX
 
 router = APIRouter(prefix="/ventas", tags=["ventas"])
 
 @router.post("/", response_model=schemas.Venta, status_code=status.HTTP_201_CREATED)
-def crear_venta(payload: schemas.VentaCreate, db: Session = Depends(get_db), current_user: schemas.User = Depends(AuthService.revisa_usuario)) -> schemas.Venta:
-    return VentaService.crea_venta(db, payload)
+async def crear_venta(payload: schemas.VentaCreate, db: Session = Depends(get_sesion), current_user: schemas.User = Depends(AuthService.revisa_usuario)) -> schemas.Venta:
+    return await ejecuta(db, VentaService.crea_venta, payload)
+
+@router.post("/completa", response_model=schemas.VentaCompleta, status_code=status.HTTP_201_CREATED)
+async def crear_venta_completa(payload: schemas.VentaCompletaCreate, db: Session = Depends(get_sesion), current_user: schemas.User = Depends(AuthService.revisa_usuario)) -> schemas.VentaCompleta:
+    return await ejecuta(db, VentaService.crea_venta_completa, payload)
 
 @router.get("/todos/", response_model=List[schemas.Venta])
-def listar_todos(db: Session = Depends(get_db), current_user: schemas.User = Depends(AuthService.revisa_usuario)) -> List[schemas.Venta]:
-    return VentaService.lista_todos(db)
+async def listar_todos(
+    response: Response,
+    request: Request,
+    stream: bool = Query(False, description="Todos los registros en NDJSON, sin paginar (o Accept: application/x-ndjson)"),
+    cursor: str | None = Query(None, description="Cursor de la siguiente página (header X-Next-Cursor)"),
+    limit: int = Query(TODOS_PAGE_SIZE, ge=1, le=TODOS_PAGE_SIZE_MAX, description="Cantidad de resultados por página"),
+    db: Session = Depends(get_sesion_lectura), current_user: schemas.User = Depends(AuthService.revisa_usuario)
+) -> List[schemas.Venta]:
+    if pide_stream(request, stream):
+        return respuesta_ndjson(VentaService.stream_todos)
+    results, next_cursor = await ejecuta(db, VentaService.lista_todos, limit, cursor)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return results
 
 @router.get("/{venta_numero}", response_model=schemas.Venta)
-def buscar_numero(venta_numero: int, db: Session = Depends(get_db), current_user: schemas.User = Depends(AuthService.revisa_usuario)) -> schemas.Venta:
-    return VentaService.busca_numero(db, venta_numero)
+async def buscar_numero(venta_numero: int, db: Session = Depends(get_sesion), current_user: schemas.User = Depends(AuthService.revisa_usuario), etag: None = Depends(condicional("ventas", sesion=get_sesion))) -> schemas.Venta:
+    return await ejecuta(db, VentaService.busca_numero, venta_numero)
 
 @router.get("/rango/fechas/", response_model=List[schemas.Venta])
-def listar_rango_fechas(
+async def listar_rango_fechas(
     fecha_inicio: datetime = Query(..., description="Digine una fecha inicial para la busqueda"),
     fecha_fin: datetime = Query(..., description="Digine una fecha final para la busqueda"),
-    db: Session = Depends(get_db), current_user: schemas.User = Depends(AuthService.revisa_usuario)
+    db: Session = Depends(get_sesion_lectura), current_user: schemas.User = Depends(AuthService.revisa_usuario)
 ) -> List[schemas.Venta]:
-    return VentaService.lista_rango_fechas(db, fecha_inicio, fecha_fin)
+    return await ejecuta(db, VentaService.lista_rango_fechas, fecha_inicio, fecha_fin)
 
 @router.put("/{venta_numero}", response_model=schemas.Venta)
-def actualizar_venta(venta_numero: int, venta_datos: schemas.VentaUpdate, db: Session = Depends(get_db), current_user: schemas.User = Depends(AuthService.revisa_usuario)) -> schemas.Venta:
-    return VentaService.actualiza_venta(db, venta_numero, venta_datos)
+async def actualizar_venta(venta_numero: int, venta_datos: schemas.VentaUpdate, db: Session = Depends(get_sesion), current_user: schemas.User = Depends(AuthService.revisa_usuario)) -> schemas.Venta:
+    return await ejecuta(db, VentaService.actualiza_venta, venta_numero, venta_datos)
 
 @router.delete("/{venta_numero}", status_code=status.HTTP_204_NO_CONTENT)
-def eliminar_venta(venta_numero: int, db: Session = Depends(get_db), current_user: schemas.User = Depends(AuthService.revisa_usuario)) -> Response:
-    VentaService.elimina_venta(db, venta_numero)
+async def eliminar_venta(venta_numero: int, db: Session = Depends(get_sesion), current_user: schemas.User = Depends(AuthService.revisa_usuario)) -> Response:
+    await ejecuta(db, VentaService.elimina_venta, venta_numero)
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 
 ####### Logica con entidades asociadas 
 
 @router.post("/{numero_venta}/articulos/", response_model=schemas.VentaArticulo, status_code=status.HTTP_201_CREATED)
-def asignar_articulo(
+async def asignar_articulo(
     numero_venta: int,
     payload: schemas.ArticuloVentaPayload,
-    db: Session = Depends(get_db), current_user: schemas.User = Depends(AuthService.revisa_usuario)
+    db: Session = Depends(get_sesion), current_user: schemas.User = Depends(AuthService.revisa_usuario)
 ) -> schemas.VentaArticulo:
     service_payload = schemas.VentaArticuloCreate(
         numero_venta=numero_venta,
         id_articulo=payload.id_articulo,
         cantidad=payload.cantidad
     )
-    return VentaService.asigna_articulo(db, service_payload)
+    return await ejecuta(db, VentaService.asigna_articulo, service_payload)
 
 @router.get("/{numero_venta}/articulos/", response_model=List[Dict])
-def listar_articulos(
+async def listar_articulos(
     numero_venta: int, 
-    db: Session = Depends(get_db), current_user: schemas.User = Depends(AuthService.revisa_usuario)
+    db: Session = Depends(get_sesion_lectura), current_user: schemas.User = Depends(AuthService.revisa_usuario)
 ) -> List[Dict]:
-    return VentaService.lista_articulos(db, numero_venta)
+    return await ejecuta(db, VentaService.lista_articulos, numero_venta)
 
 @router.put("/{numero_venta}/articulos/{id_articulo}", response_model=schemas.VentaArticulo)
-def actualizar_articulo(
+async def actualizar_articulo(
     numero_venta: int,
     id_articulo: int,
     payload: schemas.VentaArticuloUpdate,
-    db: Session = Depends(get_db), current_user: schemas.User = Depends(AuthService.revisa_usuario)
+    db: Session = Depends(get_sesion), current_user: schemas.User = Depends(AuthService.revisa_usuario)
 ) -> schemas.VentaArticulo:
-    return VentaService.actualiza_articulo(db, numero_venta, id_articulo, payload)
+    return await ejecuta(db, VentaService.actualiza_articulo, numero_venta, id_articulo, payload)
 
 @router.delete("/{numero_venta}/articulos/{id_articulo}", status_code=status.HTTP_204_NO_CONTENT)
-def eliminar_articulo(
+async def eliminar_articulo(
     numero_venta: int, 
     id_articulo: int, 
-    db: Session = Depends(get_db), current_user: schemas.User = Depends(AuthService.revisa_usuario)
+    db: Session = Depends(get_sesion), current_user: schemas.User = Depends(AuthService.revisa_usuario)
 ) -> Response:
-    VentaService.quita_articulo(db, numero_venta, id_articulo)
+    await ejecuta(db, VentaService.elimina_articulo, numero_venta, id_articulo)
     return Response(status_code=status.HTTP_204_NO_CONTENT)
\ No newline at end of file
@@ -0,0 +1,198 @@
+import logging
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+
+# cache LRU en memoria del proceso, con vencimiento por entrada y contadores de aciertos
+class TTLCache:
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._datos: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entrada = self._datos.get(key)
+            if entrada is None or entrada[0] <= time.monotonic():
+                if entrada is not None:
+                    del self._datos[key]
+                self.misses += 1
+                return None
+            self._datos.move_to_end(key)
+            self.hits += 1
+            return entrada[1]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        vence = time.monotonic() + (self.ttl if ttl is None else min(ttl, self.ttl))
+        with self._lock:
+            self._datos[key] = (vence, value)
+            self._datos.move_to_end(key)
+            while len(self._datos) > self.maxsize:
+                self._datos.popitem(last=False)
+
+    def invalida(self, key: Hashable) -> None:
+        with self._lock:
+            self._datos.pop(key, None)
+
+    def limpia(self) -> None:
+        with self._lock:
+            self._datos.clear()
+
+    def estadisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entradas": len(self._datos),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+# backends del cache de respuestas: valores con vencimiento y una "generacion" por etiqueta.
+# Invalidar una etiqueta es subir su generacion: las claves viejas dejan de consultarse y vencen solas
+class BackendMemoria:
+    local = True
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._valores = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._generaciones: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        return self._valores.get(key)
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        self._valores.set(key, value, ttl=ttl)
+
+    def generaciones(self, tags: List[str]) -> List[int]:
+        with self._lock:
+            return [self._generaciones.get(tag, 0) for tag in tags]
+
+    def incrementa(self, tags: List[str]) -> None:
+        with self._lock:
+            for tag in tags:
+                self._generaciones[tag] = self._generaciones.get(tag, 0) + 1
+
+    def entradas(self) -> int:
+        return self._valores.estadisticas()["entradas"]
+
+
+# compartido entre procesos; acepta cualquier cliente con la interfaz de redis-py (ej. fakeredis en pruebas)
+class BackendRedis:
+    local = False
+
+    def __init__(self, cliente: Any, prefijo: str = "apiweb:cache:"):
+        self.cliente = cliente
+        self.prefijo = prefijo
+
+    @classmethod
+    def desde_url(cls, url: str) -> "BackendRedis":
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("RESPONSE_CACHE_URL usa Redis: instale el extra 'redis' (pip install redis)") from e
+        return cls(redis.Redis.from_url(url))
+
+    def get(self, key: str) -> Optional[Any]:
+        valor = self.cliente.get(self.prefijo + key)
+        return None if valor is None else pickle.loads(valor)
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        self.cliente.set(self.prefijo + key, pickle.dumps(value), px=max(1, int(ttl * 1000)))
+
+    def generaciones(self, tags: List[str]) -> List[int]:
+        valores = self.cliente.mget([f"{self.prefijo}gen:{tag}" for tag in tags])
+        return [int(valor or 0) for valor in valores]
+
+    def incrementa(self, tags: List[str]) -> None:
+        pipe = self.cliente.pipeline()
+        for tag in tags:
+            pipe.incr(f"{self.prefijo}gen:{tag}")
+        pipe.execute()
+
+    def entradas(self) -> Optional[int]:
+        return None
+
+
+# cache de lecturas con invalidacion por etiquetas (una etiqueta por tabla); los contadores son del proceso.
+# Si el backend falla se sigue sin cache: se pierde velocidad, no respuestas
+class CacheEtiquetado:
+
+    def __init__(self, backend: Any, ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.errores = 0
+        self.invalidaciones = 0
+
+    @property
+    def activo(self) -> bool:
+        return self.ttl > 0
+
+    async def _llama(self, fn: Callable[..., Any], *args: Any) -> Any:
+        if self.backend.local:
+            return fn(*args)
+        return await run_in_threadpool(fn, *args)
+
+    # la generacion se lee antes de consultar la BD: si una escritura confirma mientras tanto,
+    # lo que se guarde queda bajo la generacion vieja y nadie lo vuelve a leer
+    async def obtiene(self, clave: Tuple, tags: Iterable[str], fn: Callable[[], Awaitable[Any]]) -> Any:
+        if not self.activo:
+            return await fn()
+        tags = sorted(set(tags))
+        try:
+            generaciones = await self._llama(self.backend.generaciones, tags)
+            key = repr((clave, tuple(zip(tags, generaciones))))
+            valor = await self._llama(self.backend.get, key)
+        except Exception:
+            logger.exception("Fallo la lectura del cache de respuestas")
+            self.errores += 1
+            return await fn()
+
+        if valor is not None:
+            self.hits += 1
+            return valor
+        self.misses += 1
+        valor = await fn()
+        try:
+            await self._llama(self.backend.set, key, valor, self.ttl)
+        except Exception:
+            logger.exception("Fallo la escritura del cache de respuestas")
+            self.errores += 1
+        return valor
+
+    # se llama despues del commit (sync, desde la sesion que escribio)
+    def invalida(self, tags: Iterable[str]) -> None:
+        if not self.activo:
+            return
+        try:
+            self.backend.incrementa(sorted(set(tags)))
+            self.invalidaciones += 1
+        except Exception:
+            logger.exception("Fallo la invalidacion del cache de respuestas")
+            self.errores += 1
+
+    def estadisticas(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "ttl": self.ttl,
+            "entradas": self.backend.entradas(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            "invalidaciones": self.invalidaciones,
+            "errores": self.errores,
+        }
@@ -5,6 +5,25 @@ from dotenv import load_dotenv
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./db_apiweb.db") # la BD del proyecto
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL") # replica de solo lectura (opcional)
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", 5)) # lecturas a la principal tras escribir
+
+# Pool de conexiones
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+# al arrancar, si la BD esta en una version vieja del esquema: migrar (true) o no arrancar y pedir migra_db.py (false)
+DB_AUTO_MIGRATE = os.getenv("DB_AUTO_MIGRATE", "true").lower() in ("1", "true", "yes")
+
+# PRAGMAs aplicados a cada conexion SQLite
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", 256 * 1024 * 1024))
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", -64000)) # negativo = KiB
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 5000))
 ALLOWED_ORIGINS: List[str] = os.getenv("CORS_ORIGINS", "http://localhost:5173").split(",")
 
 # Configuraciones de JWT
@@ -12,11 +31,49 @@ SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
 
+# Cache de tokens y usuarios autenticados (por proceso)
+AUTH_CACHE_TTL_SECONDS = float(os.getenv("AUTH_CACHE_TTL_SECONDS", 60))
+AUTH_CACHE_MAXSIZE = int(os.getenv("AUTH_CACHE_MAXSIZE", 1024))
+
+# Pool de hilos para bcrypt (hash y verificacion de contraseñas)
+HASH_POOL_WORKERS = int(os.getenv("HASH_POOL_WORKERS", min(4, os.cpu_count() or 1)))
+HASH_POOL_MAX_PENDING = int(os.getenv("HASH_POOL_MAX_PENDING", 64))
+
 # Configuraciones de Rate Limiting
 RATE_LIMIT_DEFAULT = os.getenv("RATE_LIMIT_DEFAULT", "1000/hour")
 RATE_LIMIT_AUTH_PER_MIN = os.getenv("RATE_LIMIT_AUTH_PER_MIN", "5/minute")
 RATE_LIMIT_API_PER_MIN = os.getenv("RATE_LIMIT_API_PER_MIN", "60/minute")
 RATE_LIMIT_BURST = os.getenv("RATE_LIMIT_BURST", "10/second")
+# estado de los limites, compartido por los workers: sqlite:///ruta (misma maquina), redis://... o memory:// (un proceso)
+RATE_LIMIT_STORAGE_URL = os.getenv("RATE_LIMIT_STORAGE_URL", "sqlite:///./rate_limits.db")
+
+# Reconstruccion periodica de las metricas del dashboard (0 = desactivada)
+DASHBOARD_RECONCILE_SECONDS = float(os.getenv("DASHBOARD_RECONCILE_SECONDS", 3600))
+
+# Paginacion de los listados /todos/
+TODOS_PAGE_SIZE = int(os.getenv("TODOS_PAGE_SIZE", 500))
+TODOS_PAGE_SIZE_MAX = int(os.getenv("TODOS_PAGE_SIZE_MAX", 5000))
+
+# Importacion masiva (/articulos/bulk): filas por transaccion y errores reportados como maximo
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", 1000))
+BULK_MAX_ERRORS = int(os.getenv("BULK_MAX_ERRORS", 1000))
+
+# Filas que se traen de la BD por vez en las exportaciones en streaming
+STREAM_YIELD_PER = int(os.getenv("STREAM_YIELD_PER", 1000))
+
+# Cache de respuestas de las lecturas del catalogo (0 = desactivado); sin URL queda en memoria del proceso
+RESPONSE_CACHE_URL = os.getenv("RESPONSE_CACHE_URL") # ej. redis://localhost:6379/0
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", 30))
+RESPONSE_CACHE_MAXSIZE = int(os.getenv("RESPONSE_CACHE_MAXSIZE", 2048))
+# sin URL: true si solo este proceso escribe en la BD (un worker). Con varios workers o scripts que escriben
+# con la app corriendo va en false (cada lectura consulta las versiones en la BD) o mejor RESPONSE_CACHE_URL
+RESPONSE_CACHE_SINGLE_PROCESS = os.getenv("RESPONSE_CACHE_SINGLE_PROCESS", "true").lower() in ("1", "true", "yes")
+
+# Conteo de consultas SQL por peticion (headers X-DB-Queries / Server-Timing) y deteccion de N+1
+DB_QUERY_METRICS = os.getenv("DB_QUERY_METRICS", "true").lower() in ("1", "true", "yes")
+DB_N_PLUS_ONE_THRESHOLD = int(os.getenv("DB_N_PLUS_ONE_THRESHOLD", 10)) # repeticiones de la misma sentencia
+DB_QUERY_BUDGET = int(os.getenv("DB_QUERY_BUDGET", 0)) # maximo de sentencias por peticion (0 = sin limite)
+DB_QUERY_STRICT = os.getenv("DB_QUERY_STRICT", "false").lower() in ("1", "true", "yes") # falla al pasar el presupuesto (pruebas)
 
 if not SECRET_KEY:
     raise ValueError("No se ha definido SECRET_KEY en el entorno (archivo .env)")
\ No newline at end of file
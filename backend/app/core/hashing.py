@@ -0,0 +1,67 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+from fastapi import HTTPException, status
+
+
+# pool acotado para bcrypt: el hash libera el GIL, asi que hilos dedicados bastan
+# y el event loop sigue atendiendo las demas peticiones mientras tanto
+class HashPool:
+
+    def __init__(self, workers: int, max_pendientes: int):
+        self.workers = workers
+        self.max_pendientes = max_pendientes
+        self.pendientes = 0
+        self.activos = 0
+        self.completados = 0
+        self.fallidos = 0
+        self.rechazados = 0
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="hash")
+        self._lock = threading.Lock()
+
+    def _corre(self, fn: Callable[..., Any], *args: Any) -> Any:
+        with self._lock:
+            self.activos += 1
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self.activos -= 1
+
+    async def ejecuta(self, fn: Callable[..., Any], *args: Any) -> Any:
+        with self._lock:
+            if self.pendientes >= self.max_pendientes:
+                self.rechazados += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Autenticacion saturada, intente de nuevo",
+                    headers={"Retry-After": "1"},
+                )
+            self.pendientes += 1
+        # completados solo cuenta los que terminaron bien; los que levantan excepcion (o se cancelan) van a fallidos
+        exito = False
+        try:
+            loop = asyncio.get_running_loop()
+            resultado = await loop.run_in_executor(self._executor, self._corre, fn, *args)
+            exito = True
+            return resultado
+        finally:
+            with self._lock:
+                self.pendientes -= 1
+                if exito:
+                    self.completados += 1
+                else:
+                    self.fallidos += 1
+
+    def estadisticas(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_pendientes": self.max_pendientes,
+                "en_cola": self.pendientes - self.activos,
+                "en_proceso": self.activos,
+                "completados": self.completados,
+                "fallidos": self.fallidos,
+                "rechazados": self.rechazados,
+            }
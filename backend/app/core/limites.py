@@ -0,0 +1,286 @@
+import logging
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Tuple
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+# limites por cubeta de fichas (token bucket): cada clave tiene hasta `capacidad` fichas que se
+# recargan a `tasa` por segundo; cada peticion gasta una. El estado vive en un backend compartido,
+# asi el limite es el mismo con uno o varios workers
+
+_SEGUNDOS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+@dataclass(frozen=True)
+class Limite:
+    nombre: str
+    capacidad: float
+    tasa: float
+    texto: str
+
+    # "60/minute" -> 60 fichas que se recargan en un minuto
+    @classmethod
+    def desde_texto(cls, nombre: str, texto: str) -> "Limite":
+        coincide = re.fullmatch(r"\s*(\d+)\s*(?:/|per)\s*(\d*)\s*(second|minute|hour|day)s?\s*", texto)
+        if not coincide:
+            raise ValueError(f"Limite invalido '{texto}' (use por ejemplo 60/minute)")
+        cantidad, periodo, unidad = int(coincide[1]), int(coincide[2] or 1), coincide[3]
+        return cls(nombre, float(cantidad), cantidad / (periodo * _SEGUNDOS[unidad]), texto)
+
+
+# cada backend recibe [(clave, capacidad, tasa)] y devuelve [(permitido, fichas)] en una sola operacion.
+# Todo o nada: primero recarga y revisa todas las cubetas y solo si todas tienen una ficha la cobra en cada una;
+# si no, guarda la recarga sin cobrar (una peticion rechazada no gasta fichas de los demas limites).
+# `permitido` es por cubeta (si tenia ficha); la peticion pasa si todas lo son
+# `bloqueante`: hace E/S (archivo o red) y desde async se llama en el threadpool, fuera del event loop
+
+class BackendLimitesMemoria:
+
+    bloqueante = False
+
+    def __init__(self):
+        self._cubetas: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def consume(self, cubetas: List[Tuple[str, float, float]], ahora: float) -> List[Tuple[bool, float]]:
+        with self._lock:
+            recargadas = []
+            for clave, capacidad, tasa in cubetas:
+                fichas, antes = self._cubetas.get(clave, (capacidad, ahora))
+                recargadas.append((clave, min(capacidad, fichas + (ahora - antes) * tasa)))
+            cobro = 1 if all(fichas >= 1 for _, fichas in recargadas) else 0
+            for clave, fichas in recargadas:
+                self._cubetas[clave] = (fichas - cobro, ahora)
+        return [(fichas >= 1, fichas - cobro) for _, fichas in recargadas]
+
+    def purga(self, antes_de: float) -> None:
+        with self._lock:
+            self._cubetas = {clave: valor for clave, valor in self._cubetas.items() if valor[1] >= antes_de}
+
+
+# archivo SQLite aparte de la BD de la app: lo comparten los workers de la misma maquina.
+# En una transaccion IMMEDIATE (nadie mas escribe en medio): un upsert recarga todas las cubetas de la
+# peticion y, si todas tienen ficha, un UPDATE la cobra
+class BackendLimitesSQLite:
+
+    bloqueante = True
+
+    _RECARGA = "min(excluded.capacidad, cubetas.fichas + (excluded.actualizado - cubetas.actualizado) * excluded.tasa)"
+    _UPSERT = (
+        "INSERT INTO cubetas (clave, fichas, actualizado, capacidad, tasa, permitido) VALUES {valores} "
+        "ON CONFLICT(clave) DO UPDATE SET "
+        f"permitido = {_RECARGA} >= 1, "
+        f"fichas = {_RECARGA}, "
+        "actualizado = excluded.actualizado, capacidad = excluded.capacidad, tasa = excluded.tasa "
+        "RETURNING clave, permitido, fichas"
+    )
+    _COBRO = "UPDATE cubetas SET fichas = fichas - 1 WHERE clave IN ({claves})"
+
+    def __init__(self, ruta: str, timeout: float = 0.05):
+        self._conexion = sqlite3.connect(ruta, timeout=timeout, isolation_level=None, check_same_thread=False)
+        self._lock = threading.Lock()
+        # perder el estado de los limites en un corte de luz no importa: sin fsync
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._conexion.execute("PRAGMA synchronous=OFF")
+        self._conexion.execute(
+            "CREATE TABLE IF NOT EXISTS cubetas (clave TEXT PRIMARY KEY, fichas REAL NOT NULL, actualizado REAL NOT NULL, "
+            "capacidad REAL NOT NULL, tasa REAL NOT NULL, permitido INTEGER NOT NULL)"
+        )
+
+    def consume(self, cubetas: List[Tuple[str, float, float]], ahora: float) -> List[Tuple[bool, float]]:
+        sql = self._UPSERT.format(valores=", ".join(["(?, ?, ?, ?, ?, ? >= 1)"] * len(cubetas)))
+        parametros = [valor for clave, capacidad, tasa in cubetas for valor in (clave, capacidad, ahora, capacidad, tasa, capacidad)]
+        with self._lock:
+            self._conexion.execute("BEGIN IMMEDIATE")
+            try:
+                filas = {clave: (bool(permitido), fichas) for clave, permitido, fichas in self._conexion.execute(sql, parametros)}
+                cobro = 1 if all(permitido for permitido, _ in filas.values()) else 0
+                if cobro:
+                    self._conexion.execute(self._COBRO.format(claves=", ".join(["?"] * len(filas))), list(filas))
+                self._conexion.execute("COMMIT")
+            except BaseException:
+                self._conexion.execute("ROLLBACK")
+                raise
+        return [(filas[clave][0], filas[clave][1] - cobro) for clave, _, _ in cubetas]
+
+    def purga(self, antes_de: float) -> None:
+        with self._lock:
+            self._conexion.execute("DELETE FROM cubetas WHERE actualizado < ?", (antes_de,))
+
+
+# compartido entre maquinas; acepta cualquier cliente con la interfaz de redis-py (ej. fakeredis en pruebas)
+class BackendLimitesRedis:
+
+    bloqueante = True
+
+    _SCRIPT = """
+    local recargadas, cobro = {}, 1
+    for i, clave in ipairs(KEYS) do
+        local capacidad, tasa, ahora = tonumber(ARGV[i * 3 - 2]), tonumber(ARGV[i * 3 - 1]), tonumber(ARGV[i * 3])
+        local estado = redis.call('HMGET', clave, 'fichas', 'actualizado')
+        local fichas = tonumber(estado[1]) or capacidad
+        local antes = tonumber(estado[2]) or ahora
+        recargadas[i] = math.min(capacidad, fichas + (ahora - antes) * tasa)
+        if recargadas[i] < 1 then
+            cobro = 0
+        end
+    end
+    local resultado = {}
+    for i, clave in ipairs(KEYS) do
+        local capacidad, tasa, ahora = tonumber(ARGV[i * 3 - 2]), tonumber(ARGV[i * 3 - 1]), tonumber(ARGV[i * 3])
+        local permitido = 0
+        if recargadas[i] >= 1 then
+            permitido = 1
+        end
+        local fichas = recargadas[i] - cobro
+        redis.call('HSET', clave, 'fichas', tostring(fichas), 'actualizado', tostring(ahora))
+        redis.call('EXPIRE', clave, math.ceil(capacidad / tasa) + 1)
+        resultado[i] = {permitido, tostring(fichas)}
+    end
+    return resultado
+    """
+
+    def __init__(self, cliente: Any, prefijo: str = "apiweb:limite:"):
+        self.cliente = cliente
+        self.prefijo = prefijo
+        self._script = cliente.register_script(self._SCRIPT)
+
+    @classmethod
+    def desde_url(cls, url: str) -> "BackendLimitesRedis":
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("RATE_LIMIT_STORAGE_URL usa Redis: instale el extra 'redis' (pip install redis)") from e
+        return cls(redis.Redis.from_url(url))
+
+    def consume(self, cubetas: List[Tuple[str, float, float]], ahora: float) -> List[Tuple[bool, float]]:
+        filas = self._script(
+            keys=[self.prefijo + clave for clave, _, _ in cubetas],
+            args=[valor for _, capacidad, tasa in cubetas for valor in (capacidad, tasa, ahora)],
+        )
+        return [(bool(int(permitido)), float(fichas)) for permitido, fichas in filas]
+
+    def purga(self, antes_de: float) -> None:
+        pass  # las claves vencen solas (EXPIRE)
+
+
+def crea_backend_limites(url: str) -> Any:
+    if url.startswith("memory://"):
+        return BackendLimitesMemoria()
+    if url.startswith("sqlite:///"):
+        return BackendLimitesSQLite(url.removeprefix("sqlite:///"))
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return BackendLimitesRedis.desde_url(url)
+    raise ValueError(f"RATE_LIMIT_STORAGE_URL no soportada: '{url}' (use memory://, sqlite:///ruta o redis://)")
+
+
+class LimiteExcedido(Exception):
+
+    def __init__(self, limite: Limite, reintento: float):
+        self.limite = limite
+        self.reintento = reintento
+
+
+class Limitador:
+
+    # las cubetas de claves que ya se recargaron por completo se borran cada tanto
+    PURGA_CADA = 10000
+
+    def __init__(self, backend: Any):
+        self.backend = backend
+        self.permitidas: Dict[str, int] = {}
+        self.rechazadas: Dict[str, int] = {}
+        self.errores = 0
+        self._peticiones = 0
+        self._tiempo = 0.0
+        self._periodo_max = 0.0
+        # consume corre a la vez en varios hilos del threadpool
+        self._metricas_lock = threading.Lock()
+
+    # gasta una ficha de cada limite para la clave; si alguno no alcanza levanta LimiteExcedido.
+    # Si el backend falla se deja pasar (mejor sin limite que sin API)
+    def consume(self, clave: str, limites: List[Limite]) -> None:
+        inicio = time.perf_counter()
+        ahora = time.time()
+        try:
+            resultado = self.backend.consume([(f"{l.nombre}:{clave}", l.capacidad, l.tasa) for l in limites], ahora)
+            with self._metricas_lock:
+                self._peticiones += 1
+                self._periodo_max = max(self._periodo_max, *(l.capacidad / l.tasa for l in limites))
+                purga = self._peticiones % self.PURGA_CADA == 0
+            if purga:
+                self.backend.purga(ahora - self._periodo_max)
+        except Exception:
+            logger.exception("Fallo el backend de rate limiting")
+            with self._metricas_lock:
+                self.errores += 1
+            return
+        finally:
+            duracion = time.perf_counter() - inicio
+            with self._metricas_lock:
+                self._tiempo += duracion
+
+        for limite, (permitido, fichas) in zip(limites, resultado):
+            if not permitido:
+                with self._metricas_lock:
+                    self.rechazadas[limite.nombre] = self.rechazadas.get(limite.nombre, 0) + 1
+                raise LimiteExcedido(limite, (1 - fichas) / limite.tasa)
+        with self._metricas_lock:
+            for limite in limites:
+                self.permitidas[limite.nombre] = self.permitidas.get(limite.nombre, 0) + 1
+
+    # version para el codigo async: con SQLite o Redis el upsert (que puede esperar el lock de otro worker
+    # hasta el timeout) corre en el threadpool; en memoria es un dict y se hace en linea
+    async def consume_async(self, clave: str, limites: List[Limite]) -> None:
+        if getattr(self.backend, "bloqueante", True):
+            await run_in_threadpool(self.consume, clave, limites)
+        else:
+            self.consume(clave, limites)
+
+    def estadisticas(self) -> Dict[str, Any]:
+        with self._metricas_lock:
+            return {
+                "backend": type(self.backend).__name__,
+                "permitidas": dict(self.permitidas),
+                "rechazadas": dict(self.rechazadas),
+                "errores": self.errores,
+                "consultas": self._peticiones,
+                "tiempo_promedio_us": round(self._tiempo / self._peticiones * 1e6, 1) if self._peticiones else 0.0,
+            }
+
+
+def respuesta_limite(error: LimiteExcedido) -> JSONResponse:
+    return JSONResponse(
+        {"error": f"Rate limit exceeded: {error.limite.texto}"},
+        status_code=429,
+        headers={"Retry-After": str(max(1, int(error.reintento + 0.999)))},
+    )
+
+
+# aplica los limites globales a todas las peticiones HTTP, con la clave que arme `clave` (usuario o IP)
+class MiddlewareLimites:
+
+    def __init__(self, app: ASGIApp, limitador: Limitador, limites: List[Limite], clave: Callable[[Request], str]):
+        self.app = app
+        self.limitador = limitador
+        self.limites = limites
+        self.clave = clave
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        try:
+            await self.limitador.consume_async(self.clave(Request(scope)), self.limites)
+        except LimiteExcedido as error:
+            await respuesta_limite(error)(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
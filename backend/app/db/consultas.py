@@ -0,0 +1,144 @@
+import logging
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+# conteo de las sentencias SQL de cada peticion: los eventos del Engine suman en el conteo del contexto actual.
+# El ContextVar pasa al threadpool (ejecuta) y a los greenlets de las sesiones async, asi cuenta lo que
+# corra la peticion en cualquier engine (principal, replica, async)
+
+
+class PresupuestoExcedido(RuntimeError):
+    pass
+
+
+class ConteoConsultas:
+
+    def __init__(self, presupuesto: int = 0, estricto: bool = False):
+        self.presupuesto = presupuesto
+        self.estricto = estricto
+        self.consultas = 0
+        self.tiempo = 0.0
+        # misma sentencia (con otros parametros) repetida: la forma tipica de un N+1
+        self.formas: Counter = Counter()
+
+    def repetidas(self, umbral: int) -> List[tuple]:
+        return [(sentencia, veces) for sentencia, veces in self.formas.most_common() if veces >= umbral]
+
+
+_conteo: ContextVar[Optional[ConteoConsultas]] = ContextVar("conteo_consultas", default=None)
+
+
+def _antes(conn, cursor, statement, parameters, context, executemany) -> None:
+    conteo = _conteo.get()
+    if conteo is None:
+        return
+    conteo.consultas += 1
+    conteo.formas[statement] += 1
+    if conteo.estricto and conteo.presupuesto and conteo.consultas > conteo.presupuesto:
+        # se corta en la sentencia que pasa el limite: la traza apunta al ciclo que la emite
+        raise PresupuestoExcedido(f"{conteo.consultas} sentencias SQL, el presupuesto es {conteo.presupuesto}: {statement}")
+    conn.info["inicio_consulta"] = time.perf_counter()
+
+
+def _despues(conn, cursor, statement, parameters, context, executemany) -> None:
+    conteo = _conteo.get()
+    inicio = conn.info.pop("inicio_consulta", None)
+    if conteo is None or inicio is None:
+        return
+    conteo.tiempo += time.perf_counter() - inicio
+
+
+def registra_consultas() -> None:
+    # a nivel de clase: cubre todos los engines, tambien el sync_engine de los async
+    if not event.contains(Engine, "before_cursor_execute", _antes):
+        event.listen(Engine, "before_cursor_execute", _antes)
+        event.listen(Engine, "after_cursor_execute", _despues)
+
+
+# cuenta lo que se ejecute dentro del bloque; sirve tambien en pruebas:
+#   with cuenta_consultas(presupuesto=3, estricto=True) as conteo: ...
+@contextmanager
+def cuenta_consultas(presupuesto: int = 0, estricto: bool = False) -> Iterator[ConteoConsultas]:
+    conteo = ConteoConsultas(presupuesto, estricto)
+    token = _conteo.set(conteo)
+    try:
+        yield conteo
+    finally:
+        _conteo.reset(token)
+
+
+class RegistroNMas1:
+
+    # rutas con N+1 detectado: (metodo, ruta, sentencia) -> repeticiones maximas vistas
+    MAXIMO = 200
+
+    def __init__(self):
+        self.detectados: Dict[tuple, int] = {}
+        self.peticiones = 0
+
+    def agrega(self, metodo: str, ruta: str, repetidas: List[tuple]) -> None:
+        self.peticiones += 1
+        for sentencia, veces in repetidas:
+            clave = (metodo, ruta, sentencia)
+            if clave in self.detectados or len(self.detectados) < self.MAXIMO:
+                self.detectados[clave] = max(veces, self.detectados.get(clave, 0))
+
+    def estadisticas(self) -> Dict[str, Any]:
+        return {
+            "peticiones_con_n_mas_1": self.peticiones,
+            "detectados": [
+                {"metodo": metodo, "ruta": ruta, "repeticiones": veces, "sentencia": sentencia}
+                for (metodo, ruta, sentencia), veces in sorted(self.detectados.items(), key=lambda item: -item[1])
+            ],
+        }
+
+
+registro_n_mas_1 = RegistroNMas1()
+
+
+# cuenta las sentencias de cada peticion HTTP y las informa en X-DB-Queries y Server-Timing (lo que corrio
+# hasta enviar los headers; en streaming el resto solo cuenta para el N+1). Una sentencia repetida `umbral`
+# veces o mas se reporta como posible N+1 (log, X-DB-N-Plus-1 y /sistema/consultas)
+class MiddlewareConsultas:
+
+    def __init__(self, app: ASGIApp, umbral: int = 10, presupuesto: int = 0, estricto: bool = False):
+        self.app = app
+        self.umbral = umbral
+        self.presupuesto = presupuesto
+        self.estricto = estricto
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with cuenta_consultas(self.presupuesto, self.estricto) as conteo:
+            async def envia(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    headers = MutableHeaders(scope=message)
+                    headers["X-DB-Queries"] = str(conteo.consultas)
+                    headers.append("Server-Timing", f'db;dur={conteo.tiempo * 1000:.2f};desc="{conteo.consultas} queries"')
+                    repetidas = conteo.repetidas(self.umbral)
+                    if repetidas:
+                        headers["X-DB-N-Plus-1"] = str(len(repetidas))
+                await send(message)
+
+            await self.app(scope, receive, envia)
+
+        ruta = getattr(scope.get("route"), "path", scope["path"])
+        if self.presupuesto and conteo.consultas > self.presupuesto:
+            logger.warning("%s %s ejecuto %s sentencias SQL (presupuesto %s)", scope["method"], ruta, conteo.consultas, self.presupuesto)
+        repetidas = conteo.repetidas(self.umbral)
+        if repetidas:
+            registro_n_mas_1.agrega(scope["method"], ruta, repetidas)
+            for sentencia, veces in repetidas:
+                logger.warning("Posible N+1 en %s %s: %s veces la sentencia %s", scope["method"], ruta, veces, " ".join(sentencia.split()))
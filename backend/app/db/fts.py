@@ -0,0 +1,61 @@
+from typing import Dict, List, Tuple
+from sqlalchemy import MetaData, event, text
+
+# tabla base -> (tabla FTS5, llave primaria, columnas indexadas, pesos bm25)
+INDICES_TEXTO: Dict[str, Tuple[str, str, List[str], List[float]]] = {
+    "articulos": ("articulos_fts", "id", ["nombre", "descripcion"], [10.0, 1.0]),
+    "clientes": ("clientes_fts", "id", ["nombre", "apellido", "correo"], [5.0, 5.0, 1.0]),
+    "tecnicos": ("tecnicos_fts", "id", ["nombre", "apellido", "especialidad"], [5.0, 5.0, 2.0]),
+    "mantenimientos": ("mantenimientos_fts", "numero", ["descripcion"], [1.0]),
+}
+
+
+def soporta_texto(dialect_name: str) -> bool:
+    return dialect_name == "sqlite"
+
+
+def _ddl_indice(tabla: str) -> List[str]:
+    fts, pk, columnas, _ = INDICES_TEXTO[tabla]
+    cols = ", ".join(columnas)
+    nuevos = ", ".join(f"new.{c}" for c in columnas)
+    viejos = ", ".join(f"old.{c}" for c in columnas)
+
+    return [
+        # tabla sombra de contenido externo: solo guarda el indice, los datos siguen en la tabla base
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({cols}, content='{tabla}', content_rowid='{pk}', "
+        f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {tabla} BEGIN "
+        f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.{pk}, {nuevos}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {tabla} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.{pk}, {viejos}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {pk}, {cols} ON {tabla} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.{pk}, {viejos}); "
+        f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.{pk}, {nuevos}); END",
+    ]
+
+
+def crea_indices_texto(connection) -> None:
+    if not soporta_texto(connection.dialect.name):
+        return
+    for tabla, (fts, _, _, _) in INDICES_TEXTO.items():
+        existe = connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :nombre"), {"nombre": fts}
+        ).first()
+        for sentencia in _ddl_indice(tabla):
+            connection.execute(text(sentencia))
+        # indice nuevo sobre una tabla con datos: se llena desde la tabla base
+        if not existe:
+            connection.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"))
+
+
+def elimina_indices_texto(connection) -> None:
+    if not soporta_texto(connection.dialect.name):
+        return
+    for fts, _, _, _ in INDICES_TEXTO.values():
+        connection.execute(text(f"DROP TABLE IF EXISTS {fts}"))
+
+
+def registra_indices_texto(metadata: MetaData) -> None:
+    # se crean y eliminan junto con create_all / drop_all
+    event.listen(metadata, "after_create", lambda target, connection, **kw: crea_indices_texto(connection))
+    event.listen(metadata, "before_drop", lambda target, connection, **kw: elimina_indices_texto(connection))
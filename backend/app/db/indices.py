@@ -0,0 +1,29 @@
+from typing import Any, Dict, List, Tuple
+from sqlalchemy import MetaData, inspect
+from sqlalchemy.engine import Connection
+
+
+# create_all no toca las tablas que ya existen: los indices nuevos de los modelos se crean aparte
+# sobre las BD existentes (solo los que faltan), sin recrear nada
+def aplica_indices(connection: Connection, metadata: MetaData) -> List[str]:
+    inspector = inspect(connection)
+    creados = []
+    for tabla in metadata.sorted_tables:
+        if not tabla.indexes or not inspector.has_table(tabla.name):
+            continue
+        existentes = {indice["name"] for indice in inspector.get_indexes(tabla.name)}
+        for indice in sorted(tabla.indexes, key=lambda i: i.name):
+            if indice.name not in existentes:
+                indice.create(connection, checkfirst=True)
+                creados.append(indice.name)
+    return creados
+
+
+# plan de SQLite (EXPLAIN QUERY PLAN) de una sentencia ya compilada, como la ejecuto el servicio
+def plan_consulta(connection: Connection, sentencia: str, parametros: Tuple | Dict[str, Any] | None = None) -> List[str]:
+    cursor = connection.connection.cursor()
+    try:
+        cursor.execute(f"EXPLAIN QUERY PLAN {sentencia}", parametros or ())
+        return [fila[3] for fila in cursor.fetchall()]
+    finally:
+        cursor.close()
@@ -0,0 +1,63 @@
+import logging
+from typing import Callable, List, Tuple
+from sqlalchemy import insert, select, update
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import DBAPIError
+from app.db.indices import aplica_indices
+from app.db.session import Base
+from app.models.models import EsquemaVersion
+
+logger = logging.getLogger(__name__)
+
+# revisiones del esquema, en orden. Cada una recibe la conexion dentro de la transaccion de la migracion
+# y debe ser idempotente (crear solo lo que falta): una BD nueva ya sale con el esquema de los modelos
+# desde la revision 1, y las siguientes solo completan BD viejas
+
+
+def _esquema_inicial(connection: Connection) -> None:
+    # tablas que falten, con los indices FTS5 (after_create de registra_indices_texto)
+    Base.metadata.create_all(connection)
+
+
+def _indices_filtros(connection: Connection) -> None:
+    creados = aplica_indices(connection, Base.metadata)
+    if creados:
+        logger.info("Indices creados: %s", ", ".join(creados))
+
+
+MIGRACIONES: List[Tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "esquema inicial (tablas, contadores, versiones, indices de texto)", _esquema_inicial),
+    (2, "indices de filtros por fecha, tipo y llaves foraneas", _indices_filtros),
+]
+VERSION_ESQUEMA = MIGRACIONES[-1][0]
+
+
+# version de la BD con una sola consulta (0 si nunca se migro); es lo unico que corre al arrancar
+def version_esquema(engine: Engine) -> int:
+    try:
+        with engine.connect() as connection:
+            return connection.execute(select(EsquemaVersion.version)).scalar() or 0
+    except DBAPIError:
+        return 0
+
+
+def migra(engine: Engine, hasta: int = VERSION_ESQUEMA) -> List[int]:
+    aplicadas = []
+    with engine.connect() as connection:
+        EsquemaVersion.__table__.create(connection, checkfirst=True)
+        connection.commit()
+
+        with connection.begin():
+            # escribir primero toma el bloqueo: si dos procesos migran a la vez, el segundo espera
+            # y despues lee la version ya actualizada
+            if not connection.execute(update(EsquemaVersion).values(version=EsquemaVersion.version)).rowcount:
+                connection.execute(insert(EsquemaVersion).values(id=1, version=0))
+            actual = connection.execute(select(EsquemaVersion.version)).scalar_one()
+
+            for numero, descripcion, revision in MIGRACIONES:
+                if actual < numero <= hasta:
+                    logger.info("Aplicando migracion %s: %s", numero, descripcion)
+                    revision(connection)
+                    connection.execute(update(EsquemaVersion).values(version=numero))
+                    aplicadas.append(numero)
+    return aplicadas
@@ -0,0 +1,54 @@
+import threading
+import time
+from typing import Any, Dict
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+
+# mide cuanto espera cada checkout del pool (incluye abrir la conexion cuando hay que crearla)
+class _EsperaMedida:
+
+    def _inicia_metricas(self) -> None:
+        self.checkouts = 0
+        self.espera_total = 0.0
+        self.espera_max = 0.0
+        self._metricas_lock = threading.Lock()
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            espera = time.perf_counter() - inicio
+            with self._metricas_lock:
+                self.checkouts += 1
+                self.espera_total += espera
+                self.espera_max = max(self.espera_max, espera)
+
+
+class PoolMedido(_EsperaMedida, QueuePool):
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self._inicia_metricas()
+
+
+class AsyncPoolMedido(_EsperaMedida, AsyncAdaptedQueuePool):
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self._inicia_metricas()
+
+
+def estadisticas_pool(pool: Any) -> Dict[str, Any]:
+    datos: Dict[str, Any] = {"pool": type(pool).__name__, "estado": pool.status()}
+    if isinstance(pool, _EsperaMedida):
+        with pool._metricas_lock:
+            datos.update({
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "overflow": pool.overflow(),
+                "checkouts": pool.checkouts,
+                "espera_promedio_ms": round(pool.espera_total / pool.checkouts * 1000, 3) if pool.checkouts else 0.0,
+                "espera_max_ms": round(pool.espera_max * 1000, 3),
+            })
+    return datos
@@ -1,17 +1,159 @@
-from sqlalchemy import create_engine
+from typing import Any, Callable, Iterator
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
-from app.core.config import DATABASE_URL
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from app.core import config
+from app.core.cache import TTLCache
+from app.core.config import DATABASE_URL, DATABASE_READ_URL, READ_YOUR_WRITES_SECONDS
+from app.db.pool import AsyncPoolMedido, PoolMedido
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+# lower() nativo de SQLite solo convierte ASCII; se reemplaza por el de Python
+# para que las busquedas sin mayusculas funcionen con tildes y eñes
+def _sqlite_lower(value):
+    return value.lower() if isinstance(value, str) else value
+
+def _configura_sqlite(dbapi_connection, connection_record):
+    dbapi_connection.create_function("lower", 1, _sqlite_lower, deterministic=True)
+
+    # WAL: los lectores no bloquean al escritor ni al reves
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={config.SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={config.SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA mmap_size={config.SQLITE_MMAP_SIZE}")
+    cursor.execute(f"PRAGMA cache_size={config.SQLITE_CACHE_SIZE}")
+    cursor.execute(f"PRAGMA busy_timeout={config.SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.close()
+
+def _sqlite_solo_lectura(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA query_only=ON")
+    cursor.close()
+
+def crea_engine(url: str | URL, asincrono: bool = False, solo_lectura: bool = False):
+    url = make_url(url)
+    es_sqlite = url.get_backend_name() == "sqlite"
+    kwargs: dict = {}
+
+    if es_sqlite and not asincrono:
+        kwargs["connect_args"] = {"check_same_thread": False}
+
+    # SQLite en memoria usa un pool de una conexion, sin parametros de pool
+    if not (es_sqlite and url.database in (None, "", ":memory:")):
+        kwargs.update(
+            poolclass=AsyncPoolMedido if asincrono else PoolMedido,
+            pool_size=config.DB_POOL_SIZE,
+            max_overflow=config.DB_MAX_OVERFLOW,
+            pool_timeout=config.DB_POOL_TIMEOUT,
+            pool_recycle=config.DB_POOL_RECYCLE,
+            pool_pre_ping=config.DB_POOL_PRE_PING,
+        )
+
+    if asincrono:
+        nuevo = create_async_engine(url, **kwargs)
+        sync_engine = nuevo.sync_engine
+    else:
+        nuevo = sync_engine = create_engine(url, **kwargs)
+
+    if es_sqlite:
+        event.listen(sync_engine, "connect", _configura_sqlite)
+        if solo_lectura:
+            event.listen(sync_engine, "connect", _sqlite_solo_lectura)
+    return nuevo
+
+# con un driver async en DATABASE_URL (ej. sqlite+aiosqlite://) las rutas usan AsyncSession;
+# el engine sync queda sobre la misma BD para create_all y los scripts
+_url = make_url(DATABASE_URL)
+ASYNC_DB = _url.get_dialect().is_async
+SYNC_DATABASE_URL = _url.set(drivername=_url.get_backend_name()) if ASYNC_DB else _url
+
+engine = crea_engine(SYNC_DATABASE_URL)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = None
+AsyncSessionLocal = None
+if ASYNC_DB:
+    async_engine = crea_engine(DATABASE_URL, asincrono=True)
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+# replica opcional para los listados, busquedas y rangos; en el mismo modo (sync/async) que la principal
+read_engine = None
+ReadSessionLocal = None
+if DATABASE_READ_URL:
+    read_engine = crea_engine(DATABASE_READ_URL, asincrono=ASYNC_DB, solo_lectura=True)
+    if ASYNC_DB:
+        ReadSessionLocal = async_sessionmaker(read_engine, autoflush=False, expire_on_commit=False)
+    else:
+        ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
+# read-your-writes: el cliente que acaba de escribir en la principal sigue leyendo de ella
+# durante READ_YOUR_WRITES_SECONDS, mientras la replica se pone al dia
+escrituras_recientes = TTLCache(maxsize=10000, ttl=READ_YOUR_WRITES_SECONDS)
+
+def _clave_cliente(request: Request) -> str:
+    return request.headers.get("authorization") or (request.client.host if request.client else "")
+
+@event.listens_for(Session, "after_commit")
+def _marca_escritura(session: Session) -> None:
+    clave = session.info.get("cliente")
+    if clave is not None:
+        escrituras_recientes.set(clave, True)
+
+def _usa_replica(request: Request) -> bool:
+    return ReadSessionLocal is not None and escrituras_recientes.get(_clave_cliente(request)) is None
+
+def get_db(request: Request):
+    db = SessionLocal(info={"cliente": _clave_cliente(request)})
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_db(request: Request):
+    async with AsyncSessionLocal(info={"cliente": _clave_cliente(request)}) as db:
+        yield db
+
+def get_read_db(request: Request):
+    if not _usa_replica(request):
+        yield from get_db(request)
+        return
+    db = ReadSessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_read_db(request: Request):
+    if not _usa_replica(request):
+        async with AsyncSessionLocal(info={"cliente": _clave_cliente(request)}) as db:
+            yield db
+        return
+    async with ReadSessionLocal() as db:
+        yield db
+
+# dependencias de las rutas: sesion async o sync segun DATABASE_URL
+get_sesion = get_async_db if ASYNC_DB else get_db
+get_sesion_lectura = get_async_read_db if ASYNC_DB else get_read_db
+
+# corre un metodo de servicio (sync, recibe la sesion como primer argumento) sin bloquear el event loop:
+# con AsyncSession via run_sync, con Session en el threadpool como lo hacia FastAPI con las rutas sync
+async def ejecuta(db: Session | AsyncSession, fn: Callable[..., Any], *args: Any) -> Any:
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args)
+    return await run_in_threadpool(fn, db, *args)
+
+# sesion propia para una respuesta en streaming: dura lo que dura el generador (no la peticion)
+# y siempre es sync, asi el generador corre en el threadpool; usa la replica si hay una sync
+def sesion_stream(fn: Callable[..., Iterator[Any]], *args: Any) -> Iterator[Any]:
+    fabrica = ReadSessionLocal if ReadSessionLocal is not None and not ASYNC_DB else SessionLocal
+    db = fabrica()
+    try:
+        yield from fn(db, *args)
+    finally:
+        db.close()
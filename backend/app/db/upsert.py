@@ -0,0 +1,8 @@
+from typing import Any, Callable, Optional
+from sqlalchemy.dialects import postgresql, sqlite
+
+# INSERT ... ON CONFLICT por motor; None si el motor no lo soporta
+INSERTS_UPSERT = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+def insert_upsert(dialect_name: str) -> Optional[Callable[..., Any]]:
+    return INSERTS_UPSERT.get(dialect_name)
@@ -0,0 +1,88 @@
+import random
+from typing import Callable, Dict, Iterable, List, Set
+from sqlalchemy import Table, event, select, update
+from sqlalchemy.orm import Session
+from app.db.upsert import insert_upsert
+
+# version por tabla: cambia en cada transaccion que escribe en la tabla (ORM o insert/update/delete por sesion).
+# Sirve para ETags: si la version no cambio, los datos tampoco
+_tabla_versiones: Table | None = None
+
+# funciones a llamar con las tablas escritas cuando la transaccion se confirma (ej. invalidar caches)
+_al_confirmar: List[Callable[[Set[str]], None]] = []
+
+
+def _incrementa(session: Session, tablas: Set[str]) -> None:
+    # una sola vez por tabla y transaccion
+    ya = session.info.setdefault("tablas_versionadas", set())
+    pendientes = tablas - ya - {_tabla_versiones.name}
+    if not pendientes:
+        return
+    ya.update(pendientes)
+
+    conexion = session.connection()
+    insert = insert_upsert(conexion.dialect.name)
+    for tabla in sorted(pendientes):
+        if insert is not None:
+            # la primera version es aleatoria: si la BD se recrea, un ETag viejo no coincide por casualidad
+            stmt = insert(_tabla_versiones).values(tabla=tabla, version=random.getrandbits(31))
+            conexion.execute(stmt.on_conflict_do_update(
+                index_elements=[_tabla_versiones.c.tabla],
+                set_={"version": _tabla_versiones.c.version + 1}
+            ))
+        elif not conexion.execute(
+            update(_tabla_versiones).where(_tabla_versiones.c.tabla == tabla).values(version=_tabla_versiones.c.version + 1)
+        ).rowcount:
+            conexion.execute(_tabla_versiones.insert().values(tabla=tabla, version=random.getrandbits(31)))
+
+
+def _despues_flush(session: Session, flush_context) -> None:
+    tablas = {
+        obj.__table__.name
+        for obj in (*session.new, *session.deleted, *(o for o in session.dirty if session.is_modified(o)))
+        if hasattr(obj, "__table__")
+    }
+    # las tablas de las relaciones borradas en cascada tambien quedan en session.deleted
+    if tablas:
+        _incrementa(session, tablas)
+
+
+def _ejecucion(orm_execute_state) -> None:
+    # insert/update/delete emitidos con session.execute (ej. upserts masivos) no pasan por el flush
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        tabla = getattr(orm_execute_state.statement, "table", None)
+        if tabla is not None and getattr(tabla, "name", None):
+            _incrementa(orm_execute_state.session, {tabla.name})
+
+
+def _confirmada(session: Session) -> None:
+    tablas = session.info.pop("tablas_versionadas", None)
+    if tablas:
+        for fn in _al_confirmar:
+            fn(tablas)
+
+
+def _revertida(session: Session, *args) -> None:
+    session.info.pop("tablas_versionadas", None)
+
+
+def al_confirmar(fn: Callable[[Set[str]], None]) -> None:
+    _al_confirmar.append(fn)
+
+
+def registra_versiones(tabla: Table) -> None:
+    global _tabla_versiones
+    _tabla_versiones = tabla
+    event.listen(Session, "after_flush", _despues_flush)
+    event.listen(Session, "do_orm_execute", _ejecucion)
+    event.listen(Session, "after_commit", _confirmada)
+    event.listen(Session, "after_rollback", _revertida)
+
+
+def lee_versiones(db: Session, tablas: Iterable[str]) -> Dict[str, int]:
+    tablas = list(tablas)
+    filas = db.execute(
+        select(_tabla_versiones.c.tabla, _tabla_versiones.c.version).where(_tabla_versiones.c.tabla.in_(tablas))
+    ).all()
+    versiones = dict(filas)
+    return {tabla: versiones.get(tabla, 0) for tabla in tablas}
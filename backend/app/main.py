@@ -1,6 +1,13 @@
 from fastapi import FastAPI
+import logging
 from fastapi.middleware.cors import CORSMiddleware
-from app.core.config import ALLOWED_ORIGINS, RATE_LIMIT_DEFAULT
+import asyncio
+from app.core.config import (
+    ALLOWED_ORIGINS, DASHBOARD_RECONCILE_SECONDS, DB_AUTO_MIGRATE,
+    DB_QUERY_METRICS, DB_N_PLUS_ONE_THRESHOLD, DB_QUERY_BUDGET, DB_QUERY_STRICT,
+)
+from app.core.limites import LimiteExcedido, MiddlewareLimites, respuesta_limite
+from app.api.limites import limitador, LIMITES_GLOBALES, clave_usuario
 from app.api.routes import clientes as clientes_router
 from app.api.routes import ordenes as ordenes_router
 from app.api.routes import tecnicos as tecnicos_router
@@ -8,26 +15,55 @@ from app.api.routes import articulos as articulos_router
 from app.api.routes import mantenimientos as mantenimientos_router
 from app.api.routes import ventas as ventas_router
 from app.api.routes import auth as auth_router
-from app.db.session import engine, Base
+from app.api.routes import reportes as reportes_router
+from app.api.routes import sistema as sistema_router
+from app.api.routes import dashboard as dashboard_router
+from app.db.session import engine, SessionLocal
+from app.db.consultas import MiddlewareConsultas, registra_consultas
+from app.db.migraciones import VERSION_ESQUEMA, migra, version_esquema
+from app.services.dashboard import DashboardService, ciclo_reconciliacion
 import app.models.models
 
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
-from slowapi.middleware import SlowAPIMiddleware
 
+logger = logging.getLogger(__name__)
 
 app = FastAPI(title="Proyecto Api Web_v1", version="1.1.0")
 
 # Configuracion de Rate Limiter
-limiter = Limiter(key_func=get_remote_address, default_limits=[RATE_LIMIT_DEFAULT])
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
-app.add_middleware(SlowAPIMiddleware)
+app.state.limitador = limitador
+app.add_exception_handler(LimiteExcedido, lambda request, error: respuesta_limite(error))
+app.add_middleware(MiddlewareLimites, limitador=limitador, limites=LIMITES_GLOBALES, clave=clave_usuario)
+
+# Conteo de consultas SQL por peticion y deteccion de N+1
+if DB_QUERY_METRICS:
+    registra_consultas()
+    app.add_middleware(MiddlewareConsultas, umbral=DB_N_PLUS_ONE_THRESHOLD, presupuesto=DB_QUERY_BUDGET, estricto=DB_QUERY_STRICT)
 
 @app.on_event("startup")
-def on_startup():
-    Base.metadata.create_all(bind=engine)
+async def on_startup():
+    # con la BD al dia el arranque es una sola consulta, sin inspeccionar tablas
+    version = version_esquema(engine)
+    if version < VERSION_ESQUEMA:
+        if not DB_AUTO_MIGRATE:
+            raise RuntimeError(f"La BD esta en la version {version} del esquema y la app usa la {VERSION_ESQUEMA}: ejecute 'python migra_db.py'")
+        migra(engine)
+    elif version > VERSION_ESQUEMA:
+        logger.warning("La BD esta en la version %s del esquema, mas nueva que la de la app (%s)", version, VERSION_ESQUEMA)
+
+    # la primera vez (o tras borrar la tabla) los contadores se arman desde los datos existentes
+    db = SessionLocal()
+    try:
+        DashboardService.reconcilia_si_vacio(db)
+    finally:
+        db.close()
+    if DASHBOARD_RECONCILE_SECONDS > 0:
+        app.state.reconciliacion = asyncio.create_task(ciclo_reconciliacion(DASHBOARD_RECONCILE_SECONDS))
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    tarea = getattr(app.state, "reconciliacion", None)
+    if tarea is not None:
+        tarea.cancel()
 
 app.add_middleware(
     CORSMiddleware,
@@ -47,4 +83,7 @@ app.include_router(ordenes_router.router)
 app.include_router(tecnicos_router.router)
 app.include_router(articulos_router.router)
 app.include_router(mantenimientos_router.router)
-app.include_router(ventas_router.router)
\ No newline at end of file
+app.include_router(ventas_router.router)
+app.include_router(reportes_router.router)
+app.include_router(sistema_router.router)
+app.include_router(dashboard_router.router)
\ No newline at end of file
@@ -1,6 +1,8 @@
-from sqlalchemy import Column, Integer, String, BigInteger, DateTime, ForeignKey, Float, Boolean
+from sqlalchemy import Column, Integer, String, BigInteger, DateTime, ForeignKey, Float, Boolean, Index
 from sqlalchemy.orm import relationship 
 from app.db.session import Base
+from app.db.fts import registra_indices_texto
+from app.db.versiones import registra_versiones
 from datetime import datetime
 
 class Cliente(Base):
@@ -19,9 +21,9 @@ class Orden(Base):
     __tablename__ = "ordenes"
 
     consecutivo = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    apertura = Column(DateTime)
+    apertura = Column(DateTime, index=True)
     
-    id_cliente = Column(Integer, ForeignKey("clientes.id"))
+    id_cliente = Column(Integer, ForeignKey("clientes.id"), index=True)
     
     cliente = relationship("Cliente", back_populates="ordenes")
     
@@ -44,28 +46,32 @@ class Articulo(Base):
     nombre = Column(String, index=True)
     descripcion = Column(String, nullable=True)
     precio = Column(Float)
-    existencia = Column(Boolean, default=False)
+    existencia = Column(Boolean, default=False, index=True)
     
     ventas = relationship("VentaArticulo", back_populates="articulo")
 
 class Mantenimiento(Base):
     __tablename__ = "mantenimientos"
     numero = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    tipo = Column(String)
+    tipo = Column(String, index=True)
     descripcion = Column(String, nullable=False)
-    apertura = Column(DateTime)
-    cierre = Column(DateTime, nullable=True)
+    # un indice por fecha: el rango (apertura OR cierre) se resuelve uniendo las dos busquedas
+    apertura = Column(DateTime, index=True)
+    cierre = Column(DateTime, nullable=True, index=True)
     precio = Column(Float)
     consecutivo_orden = Column(Integer, ForeignKey("ordenes.consecutivo"))
     
     orden = relationship("Orden", back_populates="mantenimientos")
     tecnicos = relationship("MtoTecnico", back_populates="mantenimiento", cascade="all, delete-orphan")
 
+    # mantenimientos de una orden y si sigue abierta (tipo de orden, dashboard) sin leer las filas
+    __table_args__ = (Index("ix_mantenimientos_orden_cierre", "consecutivo_orden", "cierre"),)
+
 class Venta(Base):
     __tablename__ = "ventas"
     numero = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    fecha = Column(DateTime)
-    consecutivo_orden = Column(Integer, ForeignKey("ordenes.consecutivo"))
+    fecha = Column(DateTime, index=True)
+    consecutivo_orden = Column(Integer, ForeignKey("ordenes.consecutivo"), index=True)
     
     orden = relationship("Orden", back_populates="ventas")
     articulos = relationship("VentaArticulo", back_populates="venta", cascade="all, delete-orphan")
@@ -81,6 +87,9 @@ class MtoTecnico(Base):
     mantenimiento = relationship("Mantenimiento", back_populates="tecnicos")
     tecnico = relationship("Tecnico", back_populates="mantenimientos")
 
+    # la llave primaria empieza por el mantenimiento; para buscar por tecnico hace falta el orden inverso
+    __table_args__ = (Index("ix_mto_tecnicos_tecnico_mantenimiento", "id_tecnico", "numero_mantenimiento"),)
+
 # entidad de union o asociada. para solucionar M:N
 class VentaArticulo(Base):
     __tablename__ = "venta_articulos"
@@ -92,6 +101,35 @@ class VentaArticulo(Base):
     venta = relationship("Venta", back_populates="articulos")
     articulo = relationship("Articulo", back_populates="ventas")
 
+    __table_args__ = (Index("ix_venta_articulos_articulo_venta", "id_articulo", "numero_venta"),)
+
+
+#### contadores del dashboard, mantenidos por los servicios
+
+class Metrica(Base):
+    __tablename__ = "metricas"
+
+    clave = Column(String, primary_key=True)
+    valor = Column(Float, nullable=False, default=0)
+
+
+#### version de cada tabla (ETags), se incrementa en cada transaccion que la modifica
+
+class Version(Base):
+    __tablename__ = "versiones"
+
+    tabla = Column(String, primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+
+
+#### version del esquema de la BD (app/db/migraciones.py), una sola fila
+
+class EsquemaVersion(Base):
+    __tablename__ = "esquema_version"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
 
 #### para jwt
 
@@ -101,4 +139,10 @@ class User(Base):
     id = Column(Integer, primary_key=True, index=True)
     username = Column(String, unique=True, index=True, nullable=False)
     hashed_password = Column(String, nullable=False)
-    disabled = Column(Boolean, default=False)
\ No newline at end of file
+    disabled = Column(Boolean, default=False)
+
+
+#### indices de texto completo (FTS5) para las busquedas
+
+registra_indices_texto(Base.metadata)
+registra_versiones(Version.__table__)
@@ -55,6 +55,17 @@ class ArticuloUpdate(BaseModel):
     precio: Optional[float] = None
     existencia: Optional[bool] = None
 
+class ErrorImportacion(BaseModel):
+    linea: int
+    error: str
+
+class ImportacionArticulos(BaseModel):
+    procesados: int = 0
+    insertados: int = 0
+    actualizados: int = 0
+    total_errores: int = 0
+    errores: List[ErrorImportacion] = []
+
 
 ###### Entidad MANTENIMIENTO ######
 
@@ -141,6 +152,14 @@ class VentaArticuloUpdate(BaseModel):
     cantidad: Optional[int] = Field(None, gt=0, description="Solo numeros desde el 1")
     precio_registrado: Optional[float] = None
 
+# venta con todas sus lineas en una sola peticion
+class VentaCompletaCreate(VentaCreate):
+    articulos: List[ArticuloVentaPayload] = Field(..., min_length=1, description="Lineas de la venta (articulo y cantidad)")
+
+class VentaCompleta(Venta):
+    articulos: List[VentaArticulo] = []
+    total: float
+
 
 ###### Entidad ORDEN ######
 
@@ -164,15 +183,19 @@ class UpdateOrden(BaseModel):
 
 ###### Entidad CLIENTE ######
 
-class Cliente(BaseModel):
+# solo los datos del cliente, sin el arbol de ordenes (listados)
+# el correo ya se valida como EmailStr al crear/actualizar; en la salida basta str
+class ClienteResumen(BaseModel):
     model_config = ConfigDict(from_attributes=True)
     
     id: int
     nombre: str
     apellido: str
-    correo: Optional[EmailStr] = None
+    correo: Optional[str] = None
     contacto: Optional[int] = None
     direccion: Optional[str] = None
+
+class Cliente(ClienteResumen):
     ordenes: List[Orden] = []
 
 class ClienteCreate(BaseModel):
@@ -198,3 +221,41 @@ class UserInDB(User):
 
 class TokenData(BaseModel):
     username: Optional[str] = None
+
+
+###### Reportes ######
+
+class ReporteVentasPeriodo(BaseModel):
+    periodo: str
+    ventas: int
+    ingresos: float
+
+class ReporteArticuloTop(BaseModel):
+    id_articulo: int
+    nombre: Optional[str] = None
+    cantidad: int
+    ingresos: float
+
+class ReporteVentas(BaseModel):
+    fecha_inicio: datetime
+    fecha_fin: datetime
+    agrupacion: Literal["dia", "semana", "mes"]
+    ventas: int
+    ingresos: float
+    periodos: List[ReporteVentasPeriodo] = []
+    top_articulos: List[ReporteArticuloTop] = []
+
+
+###### Dashboard ######
+
+class DashboardMetricas(BaseModel):
+    mes: str
+    articulos: int
+    clientes: int
+    clientes_activos: int
+    tecnicos: int
+    mantenimientos: int
+    ordenes: int
+    ordenes_activas: int
+    ventas_mes: int
+    ingresos_mes: float
@@ -1,8 +1,16 @@
+from collections import Counter
 from fastapi import HTTPException, status
-from typing import List, Tuple, Literal, Dict
+from typing import Any, AsyncIterator, Iterator, List, Tuple, Literal, Dict, Optional
+from pydantic import ValidationError
 from sqlalchemy.orm import Session
+from app.core.config import BULK_BATCH_SIZE, BULK_MAX_ERRORS
+from app.db.session import ejecuta
+from app.db.upsert import insert_upsert
 from app.models import schemas, models
+from app.services.bulk import escribe_csv, escribe_ndjson, filas_esquema, lee_registros
 from app.services.busqueda import busca_ordena
+from app.services.dashboard import DashboardService
+from app.services.paginacion import pagina
 
 class ArticuloService:
     @staticmethod
@@ -13,16 +21,91 @@ class ArticuloService:
         
         db_item = models.Articulo(**payload.model_dump())
         db.add(db_item)
+        DashboardService.registra(db, Counter(), Counter(articulos=1))
         db.commit()
         db.refresh(db_item)
         return db_item
 
     @staticmethod
-    def lista_todos(db: Session) -> List[models.Articulo]:
-        resultados = db.query(models.Articulo).all()
+    def lista_todos(db: Session, limit: int, cursor: Optional[str] = None) -> Tuple[List[models.Articulo], Optional[str]]:
+        resultados, siguiente = pagina(db.query(models.Articulo), None, models.Articulo.id, "asc", 0, limit, cursor, "articulos:todos")
         if not resultados:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No se encontraron articulos")
-        return resultados
+        return resultados, siguiente
+
+    # todos los registros en NDJSON, sin paginar ni cargar la tabla en memoria
+    @staticmethod
+    def stream_todos(db: Session) -> Iterator[str]:
+        return escribe_ndjson(filas_esquema(db.query(models.Articulo).order_by(models.Articulo.id), schemas.Articulo))
+
+    # importacion masiva: el cuerpo se lee por partes y se guarda en lotes de BULK_BATCH_SIZE filas,
+    # cada lote en su propia transaccion; las filas con error se reportan y no detienen la carga
+    @staticmethod
+    async def importa_articulos(db: Session, chunks: AsyncIterator[bytes], formato: Literal["csv", "ndjson"]) -> schemas.ImportacionArticulos:
+        resultado = schemas.ImportacionArticulos()
+
+        async def guarda(lote):
+            insertados, actualizados, errores = await ejecuta(db, ArticuloService.importa_lote, lote)
+            resultado.procesados += len(lote)
+            resultado.insertados += insertados
+            resultado.actualizados += actualizados
+            resultado.total_errores += len(errores)
+            espacio = BULK_MAX_ERRORS - len(resultado.errores)
+            resultado.errores.extend(schemas.ErrorImportacion(**e) for e in errores[:max(espacio, 0)])
+
+        lote = []
+        async for registro in lee_registros(chunks, formato):
+            lote.append(registro)
+            if len(lote) >= BULK_BATCH_SIZE:
+                await guarda(lote)
+                lote = []
+        if lote:
+            await guarda(lote)
+        return resultado
+
+    # un lote de la importacion masiva: valida cada fila e inserta o actualiza por id en una transaccion
+    @staticmethod
+    def importa_lote(db: Session, registros: List[Tuple[int, Dict[str, Any] | str]]) -> Tuple[int, int, List[Dict[str, Any]]]:
+        errores = []
+        validos: Dict[int, Dict[str, Any]] = {}
+        for linea, datos in registros:
+            if isinstance(datos, str):
+                errores.append({"linea": linea, "error": datos})
+                continue
+            try:
+                articulo = schemas.ArticuloCreate.model_validate(datos)
+            except ValidationError as e:
+                errores.append({"linea": linea, "error": "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())})
+                continue
+            # si el id se repite en el lote gana la ultima fila
+            validos[articulo.id] = articulo.model_dump()
+
+        if not validos:
+            return 0, 0, errores
+
+        existentes = {fila[0] for fila in db.query(models.Articulo.id).filter(models.Articulo.id.in_(list(validos)))}
+        insert = insert_upsert(db.get_bind().dialect.name)
+        if insert is None:
+            for datos in validos.values():
+                db.merge(models.Articulo(**datos))
+        else:
+            stmt = insert(models.Articulo)
+            db.execute(stmt.on_conflict_do_update(
+                index_elements=[models.Articulo.id],
+                set_={columna: stmt.excluded[columna] for columna in ("nombre", "descripcion", "precio", "existencia")}
+            ), list(validos.values()))
+
+        insertados = len(validos) - len(existentes)
+        DashboardService.registra(db, Counter(), Counter(articulos=insertados))
+        db.commit()
+        return insertados, len(existentes), errores
+
+    @staticmethod
+    def exporta(db: Session, formato: Literal["csv", "ndjson"]) -> Iterator[str]:
+        filas = filas_esquema(db.query(models.Articulo).order_by(models.Articulo.id), schemas.Articulo)
+        if formato == "csv":
+            return escribe_csv(list(schemas.Articulo.model_fields), filas)
+        return escribe_ndjson(filas)
 
     @staticmethod
     def busca_id(db: Session, articulo_id: int) -> models.Articulo:
@@ -32,28 +115,19 @@ class ArticuloService:
         return db_item
     
     @staticmethod
-    def busca_articulos(db: Session, q: str | None, sort: str, order: str, offset: int, limit: int) -> Tuple[List[models.Articulo], int]:
-        all_items_list = db.query(models.Articulo).all()
-        items_dict = {item.id: schemas.Articulo.model_validate(item) for item in all_items_list}
-  
-        resultados, total = busca_ordena(
-            items_dict=items_dict,
+    def busca_articulos(db: Session, q: str | None, sort: str, order: str, offset: int, limit: int, cursor: Optional[str] = None) -> Tuple[List[models.Articulo], Optional[int], Optional[str]]:
+        return busca_ordena(
+            db=db,
+            model=models.Articulo,
             q=q,
             search_fields=["nombre", "descripcion"],
             sort=sort,
             order=order,
             offset=offset,
-            limit=limit
+            limit=limit,
+            cursor=cursor
         )
 
-        ids_retorno = [item.id for item in resultados]
-        modelos_retorno = db.query(models.Articulo).filter(models.Articulo.id.in_(ids_retorno)).all()
-        
-        model_map = {model.id: model for model in modelos_retorno}
-        modelos_ordenados = [model_map[id_val] for id_val in ids_retorno if id_val in model_map]
-        
-        return modelos_ordenados, total
-
     @staticmethod
     def lista_por_existencia(db: Session, disponibilidad: Literal["disponible", "no disponible"]) -> List[models.Articulo]:
         existencia_bool = True if disponibilidad == "disponible" else False
@@ -126,5 +200,6 @@ class ArticuloService:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No se puede eliminar el ARTICULO porque tiene VENTAS asignados.")
             
         db.delete(db_item)
+        DashboardService.registra(db, Counter(articulos=1), Counter())
         db.commit()
         return None
\ No newline at end of file
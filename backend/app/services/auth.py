@@ -6,14 +6,23 @@ from passlib.context import CryptContext
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 
-from app.db.session import get_db
+from app.db.session import get_sesion, ejecuta
 from app.models import models, schemas
-from app.core.config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
+from app.core.config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES, AUTH_CACHE_TTL_SECONDS, AUTH_CACHE_MAXSIZE
+from app.core.config import HASH_POOL_WORKERS, HASH_POOL_MAX_PENDING
+from app.core.cache import TTLCache
+from app.core.hashing import HashPool
 
 # para el hashing con bcrypt
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 # ruta del token
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token")
+# tokens ya decodificados (token -> username) y usuarios ya consultados (username -> User).
+# La app no deshabilita usuarios: un cambio hecho directo en la BD (ej. disabled) se ve al vencer AUTH_CACHE_TTL_SECONDS
+tokens_cache = TTLCache(maxsize=AUTH_CACHE_MAXSIZE, ttl=AUTH_CACHE_TTL_SECONDS)
+usuarios_cache = TTLCache(maxsize=AUTH_CACHE_MAXSIZE, ttl=AUTH_CACHE_TTL_SECONDS)
+# bcrypt fuera del event loop
+hash_pool = HashPool(workers=HASH_POOL_WORKERS, max_pendientes=HASH_POOL_MAX_PENDING)
 
 class AuthService:
 
@@ -40,6 +49,16 @@ class AuthService:
             return None
         return user
 
+    # igual que autentica, sin bloquear el event loop: la consulta va por ejecuta y bcrypt al hash_pool
+    @staticmethod
+    async def autentica_async(db: Session, username: str, password: str) -> Optional[models.User]:
+        user = await ejecuta(db, AuthService.alista_nombre, username)
+        if not user:
+            return None
+        if not await hash_pool.ejecuta(AuthService.revisa_pass, password, user.hashed_password):
+            return None
+        return user
+
     @staticmethod
     def crea_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
         to_encode = data.copy()
@@ -62,34 +81,83 @@ class AuthService:
             )
         
         hashed_password = AuthService.alista_hash(user.password)
+        return AuthService.guarda_usuario(db, user.username, hashed_password)
+
+    @staticmethod
+    async def regist_async(db: Session, user: schemas.UserCreate) -> models.User:
+        if await ejecuta(db, AuthService.alista_nombre, user.username):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="El nombre de usuario ya existe",
+            )
+
+        hashed_password = await hash_pool.ejecuta(AuthService.alista_hash, user.password)
+        return await ejecuta(db, AuthService.guarda_usuario, user.username, hashed_password)
+
+    @staticmethod
+    def guarda_usuario(db: Session, username: str, hashed_password: str) -> models.User:
         db_user = models.User(
-            username=user.username,
+            username=username,
             hashed_password=hashed_password
         )
         db.add(db_user)
         db.commit()
         db.refresh(db_user)
+        AuthService.invalida_usuario(username)
         return db_user
 
+    # saca al usuario del cache, los tokens siguen validos pero se vuelve a consultar la BD
+    @staticmethod
+    def invalida_usuario(username: str) -> None:
+        usuarios_cache.invalida(username)
+
+    @staticmethod
+    def estadisticas_cache() -> dict:
+        return {"tokens": tokens_cache.estadisticas(), "usuarios": usuarios_cache.estadisticas()}
+
+    @staticmethod
+    def estadisticas_hash() -> dict:
+        return hash_pool.estadisticas()
+
+    # token valido (firma y vencimiento) -> datos del token; None si no sirve
+    @staticmethod
+    def decodifica_token(token: str) -> Optional[schemas.TokenData]:
+        token_data = tokens_cache.get(token)
+        if token_data is not None:
+            return token_data
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except JWTError:
+            return None
+        username: str = payload.get("sub")
+        if username is None:
+            return None
+        token_data = schemas.TokenData(username=username)
+        # el token no puede quedar en cache mas alla de su expiracion
+        exp = payload.get("exp")
+        vigencia = exp - datetime.now(timezone.utc).timestamp() if exp is not None else None
+        tokens_cache.set(token, token_data, ttl=vigencia)
+        return token_data
+
     @staticmethod
-    def revisa_usuario(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> models.User:
+    async def revisa_usuario(token: str = Depends(oauth2_scheme), db: Session = Depends(get_sesion)) -> models.User:
         credentials_exception = HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="No se pudieron validar las credenciales",
             headers={"WWW-Authenticate": "Bearer"},
         )
-        try:
-            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-            username: str = payload.get("sub")
-            if username is None:
-                raise credentials_exception
-            token_data = schemas.TokenData(username=username)
-        except JWTError:
+        token_data = AuthService.decodifica_token(token)
+        if token_data is None:
             raise credentials_exception
-        
-        user = AuthService.alista_nombre(db, username=token_data.username)
+
+        user = usuarios_cache.get(token_data.username)
         if user is None:
-            raise credentials_exception
+            user = await ejecuta(db, AuthService.alista_nombre, token_data.username)
+            if user is None:
+                raise credentials_exception
+            # copia desligada de la sesion para reutilizarla en otras peticiones
+            db.expunge(user)
+            usuarios_cache.set(token_data.username, user)
         
         if user.disabled:
              raise HTTPException(status_code=400, detail="Usuario inactivo")
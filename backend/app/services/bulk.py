@@ -0,0 +1,119 @@
+import codecs
+import csv
+import io
+import json
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, List, Tuple, Type
+from fastapi import HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy.orm import Query
+from app.core.config import STREAM_YIELD_PER
+from app.db.session import sesion_stream
+
+FORMATOS_BULK = {
+    "text/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+}
+
+def formato_bulk(content_type: str | None) -> str:
+    formato = FORMATOS_BULK.get((content_type or "").split(";")[0].strip().lower())
+    if formato is None:
+        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail="Use Content-Type text/csv o application/x-ndjson")
+    return formato
+
+async def _lineas(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    # decodifica por partes: un caracter multibyte puede quedar partido entre dos chunks
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    resto = ""
+    async for chunk in chunks:
+        resto += decoder.decode(chunk)
+        *completas, resto = resto.split("\n")
+        for linea in completas:
+            yield linea.rstrip("\r")
+    resto += decoder.decode(b"", final=True)
+    if resto.strip():
+        yield resto.rstrip("\r")
+
+# registros (numero de linea, datos) a medida que llegan, sin leer todo el cuerpo;
+# una linea que no se puede leer sale como (linea, error) en vez de datos
+async def lee_registros(chunks: AsyncIterator[bytes], formato: str) -> AsyncIterator[Tuple[int, Dict[str, Any] | str]]:
+    numero = 0
+    if formato == "ndjson":
+        async for linea in _lineas(chunks):
+            numero += 1
+            if not linea.strip():
+                continue
+            try:
+                datos = json.loads(linea)
+            except ValueError as e:
+                yield numero, f"JSON invalido: {e}"
+                continue
+            yield numero, datos if isinstance(datos, dict) else "Se esperaba un objeto JSON"
+        return
+
+    # CSV: un registro termina cuando las comillas quedan balanceadas (campos con saltos de linea)
+    columnas = None
+    registro, inicio = "", 0
+    async for linea in _lineas(chunks):
+        numero += 1
+        if not registro:
+            inicio = numero
+        registro = f"{registro}\n{linea}" if registro else linea
+        if registro.count('"') % 2:
+            continue
+        if not registro.strip():
+            registro = ""
+            continue
+        valores = next(csv.reader([registro]))
+        registro = ""
+        if columnas is None:
+            columnas = [c.strip() for c in valores]
+            continue
+        if len(valores) != len(columnas):
+            yield inicio, f"Se esperaban {len(columnas)} columnas y llegaron {len(valores)}"
+            continue
+        # celda vacia = sin valor
+        yield inicio, {c: v for c, v in zip(columnas, valores) if v != ""}
+    if registro:
+        yield inicio, "Comillas sin cerrar al final del archivo"
+
+# la salida se entrega en bloques de ~64KB: ni una escritura por fila ni todo en memoria
+TAMANO_BLOQUE = 64 * 1024
+
+def escribe_csv(columnas: List[str], filas: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columnas, extrasaction="ignore", lineterminator="\n")
+    writer.writeheader()
+    for fila in filas:
+        writer.writerow(fila)
+        if buffer.tell() >= TAMANO_BLOQUE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def escribe_ndjson(filas: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    bloque, tamano = [], 0
+    for fila in filas:
+        linea = json.dumps(fila, ensure_ascii=False, default=str) + "\n"
+        bloque.append(linea)
+        tamano += len(linea)
+        if tamano >= TAMANO_BLOQUE:
+            yield "".join(bloque)
+            bloque, tamano = [], 0
+    if bloque:
+        yield "".join(bloque)
+
+# filas serializadas a medida que se leen: yield_per trae de a STREAM_YIELD_PER, nunca toda la tabla
+def filas_esquema(query: Query, esquema: Type[BaseModel]) -> Iterator[Dict[str, Any]]:
+    for fila in query.yield_per(STREAM_YIELD_PER):
+        yield esquema.model_validate(fila).model_dump(mode="json")
+
+# modo streaming de los listados: ?stream=true o Accept: application/x-ndjson
+def pide_stream(request: Request, stream: bool) -> bool:
+    return stream or "application/x-ndjson" in request.headers.get("accept", "")
+
+def respuesta_ndjson(fn: Callable[..., Iterator[str]], *args: Any) -> StreamingResponse:
+    return StreamingResponse(sesion_stream(fn, *args), media_type="application/x-ndjson")
@@ -1,39 +1,65 @@
-from typing import Dict, Any, List, Tuple, Optional, Union
+import re
+from typing import Any, List, Optional, Sequence, Tuple, Type
+from sqlalchemy import column, func, inspect, literal_column, or_, table
+from sqlalchemy.orm import Session
+from app.db.fts import INDICES_TEXTO, soporta_texto
+from app.services.paginacion import pagina
+
+# "radia 24" -> "radia"* "24"* (todos los terminos, cada uno como prefijo)
+def expresion_texto(q: int | str) -> Optional[str]:
+    terminos = re.findall(r"\w+", str(q))
+    if not terminos:
+        return None
+    return " ".join(f'"{termino}"*' for termino in terminos)
 
 def busca_ordena(
-    items_dict: Dict[Any, Any],
+    db: Session,
+    model: Type[Any],
     q: int | str | None,
     search_fields: List[str],
     sort: str,
     order: str,
     offset: int,
-    limit: int
-) -> Tuple[List[Any], int]:
+    limit: int,
+    cursor: Optional[str] = None,
+    opciones: Sequence[Any] = ()
+) -> Tuple[List[Any], Optional[int], Optional[str]]:
+
+    # opciones de carga (ej. selectinload) para las relaciones que se van a serializar
+    query = db.query(model).options(*opciones)
+    pk = inspect(model).primary_key[0]
+    firma = f"{model.__tablename__}:{sort}:{order}"
+    # con cursor no se recalcula el total en cada pagina
+    contar = cursor is None
+
+    # busqueda por relevancia con el indice FTS5
+    if sort == "relevancia":
+        expresion = expresion_texto(q) if q is not None else None
+        indice = INDICES_TEXTO.get(model.__tablename__)
+        if expresion and indice and soporta_texto(db.get_bind().dialect.name):
+            nombre_fts, _, _, pesos = indice
+            fts = table(nombre_fts, column("rowid"), column(nombre_fts))
+            query = query.join(fts, fts.c.rowid == pk).filter(fts.c[nombre_fts].match(expresion))
+
+            total = query.count() if contar else None
+            rank = func.bm25(literal_column(nombre_fts), *pesos)
+            resultados, siguiente = pagina(query, rank, pk, order, offset, limit, cursor, firma)
+            return resultados, total, siguiente
+        # sin indice disponible se busca por subcadena y se ordena por llave
+        sort = None
 
-    results = list(items_dict.values())
-    
-    # busqueda
+    # busqueda (sin distinguir mayusculas, los campos nulos se comparan como "None")
     if q is not None:
-        search_query = str(q).lower()
-        
-        filtered_results = []
-        for item in results:
-            found = False
-            for field in search_fields:
-                if search_query in str(getattr(item, field, "")).lower():
-                    found = True
-                    break
-            if found:
-                filtered_results.append(item)
-        results = filtered_results
-
-    # ordenamiento
-    if sort:
-        results = sorted(
-            results,
-            key=lambda item: str(getattr(item, sort, "")).lower(),
-            reverse=(order == "desc")
-        )
-
-    total = len(results)
-    return results[offset: offset + limit], total
\ No newline at end of file
+        search_query = str(q)
+        query = query.filter(or_(*[
+            func.coalesce(getattr(model, field), "None").icontains(search_query, autoescape=True)
+            for field in search_fields
+        ]))
+
+    total = query.count() if contar else None
+
+    # ordenamiento, con desempate por llave primaria igual que el sort estable sobre la tabla
+    sort_key = func.lower(func.coalesce(getattr(model, sort), "None")) if sort else None
+
+    resultados, siguiente = pagina(query, sort_key, pk, order, offset, limit, cursor, firma)
+    return resultados, total, siguiente
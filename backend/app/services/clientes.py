@@ -1,10 +1,19 @@
+from collections import Counter
 from fastapi import HTTPException, status
-from typing import Dict, Tuple, List
-from app.models.schemas import Cliente, ClienteCreate, ClienteUpdate
+from typing import Iterator, Tuple, List, Optional
+from app.models.schemas import Cliente, ClienteCreate, ClienteResumen, ClienteUpdate
+from app.services.bulk import escribe_ndjson, filas_esquema
 from app.services.busqueda import busca_ordena
-from sqlalchemy.orm import Session
+from app.services.dashboard import DashboardService
+from app.services.paginacion import pagina
+from sqlalchemy.orm import Session, selectinload
 from app.models import models
 
+# arbol cliente -> ordenes -> mantenimientos y ventas: una consulta por nivel en vez de una por fila
+CARGA_ORDENES = (
+    selectinload(models.Cliente.ordenes).selectinload(models.Orden.mantenimientos),
+    selectinload(models.Cliente.ordenes).selectinload(models.Orden.ventas),
+)
 
 class ClienteService:
 
@@ -18,46 +27,57 @@ class ClienteService:
         cliente = models.Cliente(**payload.model_dump())
         # pasos para la BD
         db.add(cliente)
+        DashboardService.registra(db, Counter(), Counter(clientes=1))
         db.commit()
         db.refresh(cliente)
         
         return Cliente.model_validate(cliente)
 
     @staticmethod
-    def lista_todos(db: Session) -> List[Cliente]:
-        # toma todos los clientes  de la BD
-        clientes_models = db.query(models.Cliente).all()
+    def lista_todos(db: Session, limit: int, cursor: Optional[str] = None, incluye_ordenes: bool = False) -> Tuple[List[Cliente] | List[ClienteResumen], Optional[str]]:
+        # toma una pagina de clientes de la BD, por llave; las ordenes solo si se piden
+        query = db.query(models.Cliente).options(*CARGA_ORDENES) if incluye_ordenes else db.query(models.Cliente)
+        clientes_models, siguiente = pagina(query, None, models.Cliente.id, "asc", 0, limit, cursor, "clientes:todos")
         if not clientes_models:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No se encontraron clientes")
         # de Alchemy a pydantic
-        return [Cliente.model_validate(c) for c in clientes_models]
+        esquema = Cliente if incluye_ordenes else ClienteResumen
+        return [esquema.model_validate(c) for c in clientes_models], siguiente
+
+    # todos los clientes en NDJSON, sin paginar ni cargar la tabla en memoria
+    @staticmethod
+    def stream_todos(db: Session, incluye_ordenes: bool = False) -> Iterator[str]:
+        query = db.query(models.Cliente).order_by(models.Cliente.id)
+        if incluye_ordenes:
+            return escribe_ndjson(filas_esquema(query.options(*CARGA_ORDENES), Cliente))
+        return escribe_ndjson(filas_esquema(query, ClienteResumen))
 
     @staticmethod
     def busca_id(db: Session, cliente_id: int) -> Cliente:
-        cliente = db.query(models.Cliente).filter(models.Cliente.id == cliente_id).first()
+        cliente = db.query(models.Cliente).options(*CARGA_ORDENES).filter(models.Cliente.id == cliente_id).first()
         if not cliente:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Cliente con id {cliente_id} NO EXISTE en la BD.")
         return Cliente.model_validate(cliente)
 
     @staticmethod
-    def busca_clientes(db: Session, q: int | str | None, sort: str, order: str, offset: int, limit: int) -> Tuple[List[Cliente], int]:
-        # toma todos los clientes  de la BD
-        los_clientes = db.query(models.Cliente).all()
-
-        clientes: Dict[int, Cliente] = {
-            client.id: Cliente.model_validate(client) for client in los_clientes
-        }
-
-        return busca_ordena(
-            items_dict=clientes,
+    def busca_clientes(db: Session, q: int | str | None, sort: str, order: str, offset: int, limit: int, cursor: Optional[str] = None, incluye_ordenes: bool = False) -> Tuple[List[Cliente] | List[ClienteResumen], Optional[int], Optional[str]]:
+        # filtra, ordena y pagina en la BD
+        los_clientes, total, siguiente = busca_ordena(
+            db=db,
+            model=models.Cliente,
             q=q,
             search_fields=["nombre", "apellido", "correo"],
             sort=sort,
             order=order,
             offset=offset,
-            limit=limit
+            limit=limit,
+            cursor=cursor,
+            opciones=CARGA_ORDENES if incluye_ordenes else ()
         )
 
+        esquema = Cliente if incluye_ordenes else ClienteResumen
+        return [esquema.model_validate(client) for client in los_clientes], total, siguiente
+
     @staticmethod
     def actualiza_clientes(db: Session, cliente_id: int, payload: ClienteUpdate) -> Cliente:
         cliente = db.query(models.Cliente).filter(models.Cliente.id == cliente_id).first()
@@ -88,5 +108,6 @@ class ClienteService:
             raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="CLIENTE tiene órdenes asociadas y NO puede ser eliminado.")
             
         db.delete(db_cliente)
+        DashboardService.registra(db, Counter(clientes=1), Counter())
         db.commit()
         return None
\ No newline at end of file
@@ -0,0 +1,229 @@
+import asyncio
+import logging
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+from sqlalchemy import exists, extract, func, select, text
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from app.db.session import SessionLocal
+from app.db.upsert import insert_upsert
+from app.models import schemas, models
+
+logger = logging.getLogger(__name__)
+
+# candado de escritura de las metricas por motor; lo suelta el commit (o el rollback)
+BLOQUEOS = {
+    # en SQLite cualquier escritura toma el candado de toda la BD, aunque no cambie filas
+    "sqlite": text("UPDATE metricas SET valor = valor WHERE clave = ''"),
+    "postgresql": text("SELECT pg_advisory_xact_lock(hashtext('metricas'))"),
+}
+# motores donde el upsert de registra ya toma el candado
+ESCRITURA_BLOQUEA = {"sqlite"}
+
+class DashboardService:
+
+    # los servicios suman a los contadores lo que ya saben de la escritura (ej. un cliente nuevo es clientes +1)
+    # y solo consultan lo que no: si el cliente ya tenia ordenes, si la orden tenia mantenimientos abiertos.
+    # Esas consultas van despues de `bloquea`, en la misma transaccion que la escritura y el registro, asi
+    # dos escrituras concurrentes no miden el mismo estado ni se cruzan con una reconciliacion.
+    # Los borrados en cascada (una orden con sus mantenimientos y ventas) toman el "aporte" completo antes
+    # y despues de escribir y guardan la diferencia
+
+    @staticmethod
+    def bloquea(db: Session) -> None:
+        # una vez por transaccion
+        db.connection()
+        transaccion = db.get_transaction()
+        if db.info.get("metricas_bloqueadas") is transaccion:
+            return
+        bloqueo = BLOQUEOS.get(db.get_bind().dialect.name)
+        if bloqueo is not None:
+            db.execute(bloqueo)
+        db.info["metricas_bloqueadas"] = transaccion
+
+    @staticmethod
+    def tiene_ordenes(db: Session, cliente_id: int) -> bool:
+        return db.query(exists().where(models.Orden.id_cliente == cliente_id)).scalar()
+
+    @staticmethod
+    def tiene_abiertos(db: Session, consecutivo: int) -> bool:
+        return db.query(exists().where(
+            models.Mantenimiento.consecutivo_orden == consecutivo, models.Mantenimiento.cierre.is_(None)
+        )).scalar()
+
+    # clientes con ordenes y ordenes con mantenimientos abiertos, entre los indicados
+    @staticmethod
+    def activos(db: Session, clientes: Iterable = (), ordenes: Iterable = ()) -> Counter:
+        DashboardService.bloquea(db)
+        db.flush()
+        return Counter({
+            "clientes_activos": sum(DashboardService.tiene_ordenes(db, cliente_id) for cliente_id in set(clientes) - {None}),
+            "ordenes_activas": sum(DashboardService.tiene_abiertos(db, consecutivo) for consecutivo in set(ordenes) - {None}),
+        })
+
+    # lo que una venta suma al mes de su fecha
+    @staticmethod
+    def venta_mes(fecha: Optional[datetime], ventas: int = 0, ingresos: float = 0) -> Counter:
+        if fecha is None:
+            return Counter()
+        mes = fecha.strftime("%Y-%m")
+        return Counter({f"ventas_mes:{mes}": ventas, f"ingresos_mes:{mes}": ingresos})
+
+    @staticmethod
+    def ingresos_venta(db: Session, venta_numero: int) -> float:
+        return db.query(func.coalesce(func.sum(models.VentaArticulo.precio_registrado), 0)).filter(
+            models.VentaArticulo.numero_venta == venta_numero
+        ).scalar()
+
+    @staticmethod
+    def aporte_cliente(db: Session, cliente_id: int) -> Counter:
+        if not db.get(models.Cliente, cliente_id):
+            return Counter()
+        return Counter({"clientes": 1, "clientes_activos": int(DashboardService.tiene_ordenes(db, cliente_id))})
+
+    @staticmethod
+    def _aporte_ventas(db: Session, *condiciones) -> Counter:
+        filas = db.query(
+            extract("year", models.Venta.fecha),
+            extract("month", models.Venta.fecha),
+            func.coalesce(func.sum(models.VentaArticulo.precio_registrado), 0)
+        ).outerjoin(models.VentaArticulo).filter(*condiciones).group_by(models.Venta.numero).all()
+
+        aporte = Counter()
+        for anio, mes, ingresos in filas:
+            if anio is None:
+                continue
+            aporte[f"ventas_mes:{int(anio):04d}-{int(mes):02d}"] += 1
+            aporte[f"ingresos_mes:{int(anio):04d}-{int(mes):02d}"] += ingresos
+        return aporte
+
+    # la orden arrastra sus mantenimientos y ventas (se borran en cascada con ella)
+    @staticmethod
+    def aporte_orden(db: Session, consecutivo: int) -> Counter:
+        if not db.get(models.Orden, consecutivo):
+            return Counter()
+        mantenimientos, abiertos = db.query(
+            func.count(models.Mantenimiento.numero),
+            func.count(models.Mantenimiento.numero).filter(models.Mantenimiento.cierre.is_(None))
+        ).filter(models.Mantenimiento.consecutivo_orden == consecutivo).one()
+
+        aporte = Counter({"ordenes": 1, "ordenes_activas": 1 if abiertos else 0, "mantenimientos": mantenimientos})
+        aporte.update(DashboardService._aporte_ventas(db, models.Venta.consecutivo_orden == consecutivo))
+        return aporte
+
+    @staticmethod
+    def aporte(db: Session, clientes: Iterable = (), ordenes: Iterable = ()) -> Counter:
+        DashboardService.bloquea(db)
+        # lo pendiente en la sesion (autoflush=False) se escribe antes de medir
+        db.flush()
+        total = Counter()
+        for cliente_id in set(clientes) - {None}:
+            total.update(DashboardService.aporte_cliente(db, cliente_id))
+        for consecutivo in set(ordenes) - {None}:
+            total.update(DashboardService.aporte_orden(db, consecutivo))
+        return total
+
+    @staticmethod
+    def registra(db: Session, antes: Counter, despues: Counter) -> None:
+        cambios = {clave: despues.get(clave, 0) - antes.get(clave, 0) for clave in set(antes) | set(despues)}
+        cambios = {clave: delta for clave, delta in cambios.items() if delta}
+        if not cambios:
+            return
+        if db.get_bind().dialect.name not in ESCRITURA_BLOQUEA:
+            DashboardService.bloquea(db)
+        # upsert para sumar sobre contadores que todavia no existen (ej. un mes nuevo)
+        insert = insert_upsert(db.get_bind().dialect.name)
+        if insert is None:
+            for clave, delta in cambios.items():
+                metrica = db.get(models.Metrica, clave) or models.Metrica(clave=clave, valor=0)
+                metrica.valor += delta
+                db.add(metrica)
+            return
+        stmt = insert(models.Metrica).values([{"clave": clave, "valor": delta} for clave, delta in cambios.items()])
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[models.Metrica.clave],
+            set_={"valor": models.Metrica.valor + stmt.excluded.valor}
+        ))
+
+    @staticmethod
+    def metricas(db: Session) -> schemas.DashboardMetricas:
+        mes = datetime.now().strftime("%Y-%m")
+        claves = ["articulos", "clientes", "clientes_activos", "tecnicos", "mantenimientos", "ordenes", "ordenes_activas"]
+        filas = db.query(models.Metrica).filter(
+            models.Metrica.clave.in_(claves + [f"ventas_mes:{mes}", f"ingresos_mes:{mes}"])
+        ).all()
+        valores: Dict[str, float] = {fila.clave.split(":")[0]: fila.valor for fila in filas}
+
+        return schemas.DashboardMetricas(
+            mes=mes,
+            **{clave: int(valores.get(clave, 0)) for clave in claves},
+            ventas_mes=int(valores.get("ventas_mes", 0)),
+            ingresos_mes=valores.get("ingresos_mes", 0.0),
+        )
+
+    # reconstruye todos los contadores desde las tablas, en una transaccion con el candado tomado: las
+    # escrituras que lleguen mientras tanto esperan y suman sobre los valores nuevos.
+    # Con `vigencia` no hace nada si otro proceso reconcilio hace menos de esos segundos
+    @staticmethod
+    def reconcilia(db: Session, vigencia: float = 0) -> bool:
+        DashboardService.bloquea(db)
+        if vigencia:
+            ultima = db.get(models.Metrica, "reconciliada_en")
+            if ultima is not None and time.time() - ultima.valor < vigencia:
+                db.rollback()
+                return False
+
+        valores = Counter({
+            "articulos": db.query(func.count(models.Articulo.id)).scalar(),
+            "clientes": db.query(func.count(models.Cliente.id)).scalar(),
+            "clientes_activos": db.query(func.count(func.distinct(models.Orden.id_cliente))).scalar(),
+            "tecnicos": db.query(func.count(models.Tecnico.id)).scalar(),
+            "mantenimientos": db.query(func.count(models.Mantenimiento.numero)).scalar(),
+            "ordenes": db.query(func.count(models.Orden.consecutivo)).scalar(),
+            "ordenes_activas": db.query(func.count(func.distinct(models.Mantenimiento.consecutivo_orden))).filter(
+                models.Mantenimiento.cierre.is_(None)
+            ).scalar(),
+        })
+
+        por_venta = select(
+            extract("year", models.Venta.fecha).label("anio"),
+            extract("month", models.Venta.fecha).label("mes"),
+            func.coalesce(func.sum(models.VentaArticulo.precio_registrado), 0).label("ingresos")
+        ).outerjoin(models.VentaArticulo).where(models.Venta.fecha.is_not(None)).group_by(models.Venta.numero).subquery()
+        meses = db.query(
+            por_venta.c.anio, por_venta.c.mes, func.count(), func.sum(por_venta.c.ingresos)
+        ).group_by(por_venta.c.anio, por_venta.c.mes).all()
+        for anio, mes, ventas, ingresos in meses:
+            valores[f"ventas_mes:{int(anio):04d}-{int(mes):02d}"] = ventas
+            valores[f"ingresos_mes:{int(anio):04d}-{int(mes):02d}"] = ingresos
+        valores["reconciliada_en"] = time.time()
+
+        db.query(models.Metrica).delete()
+        db.add_all([models.Metrica(clave=clave, valor=valor) for clave, valor in valores.items()])
+        db.commit()
+        return True
+
+    @staticmethod
+    def reconcilia_si_vacio(db: Session) -> None:
+        if not db.query(models.Metrica.clave).first():
+            DashboardService.reconcilia(db)
+
+
+def _reconcilia_nueva_sesion(vigencia: float) -> None:
+    db = SessionLocal()
+    try:
+        DashboardService.reconcilia(db, vigencia)
+    finally:
+        db.close()
+
+# cada worker corre el ciclo, pero reconcilia solo el primero que llega en cada intervalo
+# (con margen para el desfase de los sleep)
+async def ciclo_reconciliacion(intervalo: float) -> None:
+    while True:
+        await asyncio.sleep(intervalo)
+        try:
+            await run_in_threadpool(_reconcilia_nueva_sesion, intervalo * 0.9)
+        except Exception:
+            logger.exception("Fallo la reconciliacion de metricas del dashboard")
@@ -1,8 +1,12 @@
+from collections import Counter
 from fastapi import HTTPException, status
-from typing import List, Tuple, Literal
+from typing import List, Tuple, Literal, Optional, Iterator
 from sqlalchemy.orm import Session
 from app.models import schemas, models
+from app.services.bulk import escribe_ndjson, filas_esquema
 from app.services.busqueda import busca_ordena
+from app.services.dashboard import DashboardService
+from app.services.paginacion import pagina
 from datetime import datetime
 from sqlalchemy import or_
 
@@ -15,17 +19,26 @@ class MantenimientoService:
         
         db_mto = models.Mantenimiento(**payload.model_dump())
         
+        # la orden pasa a activa con su primer mantenimiento abierto
+        DashboardService.bloquea(db)
+        activa_orden = db_mto.cierre is None and not DashboardService.tiene_abiertos(db, db_mto.consecutivo_orden)
         db.add(db_mto)
+        DashboardService.registra(db, Counter(), Counter(mantenimientos=1, ordenes_activas=int(activa_orden)))
         db.commit()
         db.refresh(db_mto)
         return db_mto
 
     @staticmethod
-    def lista_todos(db: Session) -> List[models.Mantenimiento]:
-        resultados = db.query(models.Mantenimiento).all()
+    def lista_todos(db: Session, limit: int, cursor: Optional[str] = None) -> Tuple[List[models.Mantenimiento], Optional[str]]:
+        resultados, siguiente = pagina(db.query(models.Mantenimiento), None, models.Mantenimiento.numero, "asc", 0, limit, cursor, "mantenimientos:todos")
         if not resultados:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No se encontraron mantenimientos")
-        return resultados
+        return resultados, siguiente
+
+    # todos los registros en NDJSON, sin paginar ni cargar la tabla en memoria
+    @staticmethod
+    def stream_todos(db: Session) -> Iterator[str]:
+        return escribe_ndjson(filas_esquema(db.query(models.Mantenimiento).order_by(models.Mantenimiento.numero), schemas.Mantenimiento))
 
     @staticmethod
     def busca_numero(db: Session, mto_numero: int) -> models.Mantenimiento:
@@ -35,27 +48,18 @@ class MantenimientoService:
         return db_mto
 
     @staticmethod
-    def busca_mantenimientos(db: Session, q: str | None, sort: str, order: str, offset: int, limit: int) -> Tuple[List[models.Mantenimiento], int]:
-        all_items_list = db.query(models.Mantenimiento).all()
-        items_dict = {item.numero: schemas.Mantenimiento.model_validate(item) for item in all_items_list}
-        
-        resultados, total = busca_ordena(
-            items_dict=items_dict,
+    def busca_mantenimientos(db: Session, q: str | None, sort: str, order: str, offset: int, limit: int, cursor: Optional[str] = None) -> Tuple[List[models.Mantenimiento], Optional[int], Optional[str]]:
+        return busca_ordena(
+            db=db,
+            model=models.Mantenimiento,
             q=q,
             search_fields=["descripcion"],
             sort=sort,
             order=order,
             offset=offset,
-            limit=limit
+            limit=limit,
+            cursor=cursor
         )
-        
-        ids_retorno = [item.numero for item in resultados]
-        modelos_retorno = db.query(models.Mantenimiento).filter(models.Mantenimiento.numero.in_(ids_retorno)).all()
-        
-        model_map = {model.numero: model for model in modelos_retorno}
-        modelos_ordenados = [model_map[id_val] for id_val in ids_retorno if id_val in model_map]
-        
-        return modelos_ordenados, total
 
     @staticmethod
     def lista_por_tipo(db: Session, tipo: Literal["Correctivo", "Preventivo"]) -> List[models.Mantenimiento]:
@@ -85,7 +89,7 @@ class MantenimientoService:
                 models.Mantenimiento.apertura.between(fecha_inicio, fecha_fin),
                 models.Mantenimiento.cierre.between(fecha_inicio, fecha_fin)
             )
-        ).all()
+        ).order_by(models.Mantenimiento.numero).all()
         
         if not resultados:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No se encontraron mantenimientos en ese rango de fechas")
@@ -103,6 +107,10 @@ class MantenimientoService:
             return db_mto 
 
         is_modified = False
+        # el cierre y el cambio de orden mueven las ordenes activas
+        ordenes = {db_mto.consecutivo_orden, actualizar.get('consecutivo_orden', db_mto.consecutivo_orden)}
+        mueve_activas = 'cierre' in actualizar or len(ordenes) > 1
+        antes = DashboardService.activos(db, ordenes=ordenes) if mueve_activas else Counter()
 
         if 'consecutivo_orden' in actualizar:
             nuevo_consecutivo = actualizar['consecutivo_orden']
@@ -125,6 +133,8 @@ class MantenimientoService:
         if not is_modified:
             return db_mto
 
+        if mueve_activas:
+            DashboardService.registra(db, antes, DashboardService.activos(db, ordenes=ordenes))
         db.commit()
         db.refresh(db_mto)
         return db_mto
@@ -139,7 +149,12 @@ class MantenimientoService:
         if tiene_tecnicos:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No se puede eliminar el MANTENIMIENTO porque tiene TECNICOS asignados.")
         
+        # si estaba abierto, la orden sigue activa solo si le queda otro abierto
+        DashboardService.bloquea(db)
+        abierto = db_mto.cierre is None
         db.delete(db_mto)
+        despues = DashboardService.activos(db, ordenes=[db_mto.consecutivo_orden]) if abierto else Counter()
+        DashboardService.registra(db, Counter(mantenimientos=1, ordenes_activas=int(abierto)), despues)
         db.commit()
         return None
 
@@ -1,12 +1,24 @@
+from collections import Counter
 from fastapi import HTTPException, status
-from typing import Dict, Tuple, List, Any, Literal
+from typing import Dict, Iterator, Tuple, List, Any, Literal, Optional
 from app.models.schemas import Orden, CrearOrden, UpdateOrden
+from app.services.bulk import escribe_ndjson, filas_esquema
 from app.services.busqueda import busca_ordena
+from app.services.dashboard import DashboardService
+from app.services.paginacion import pagina
 from sqlalchemy.orm import Session
 from app.models import models
-from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import selectinload
+from sqlalchemy import and_
 from datetime import datetime
 
+# ventas y mantenimientos en una consulta aparte cada uno: un JOIN de ambas listas
+# devolveria ventas x mantenimientos filas por orden
+CARGA_RELACIONES = (
+    selectinload(models.Orden.ventas),
+    selectinload(models.Orden.mantenimientos),
+)
+
 class OrdenService:
 
     @staticmethod
@@ -18,7 +30,11 @@ class OrdenService:
 
         orden = models.Orden(**payload.model_dump())
         
+        # con su primera orden el cliente pasa a activo
+        DashboardService.bloquea(db)
+        activa_cliente = not DashboardService.tiene_ordenes(db, orden.id_cliente)
         db.add(orden)
+        DashboardService.registra(db, Counter(), Counter(ordenes=1, clientes_activos=int(activa_cliente)))
         db.commit()
         db.refresh(orden)
 
@@ -26,77 +42,72 @@ class OrdenService:
         return Orden.model_validate(orden)
 
     @staticmethod
-    def lista_todos(db: Session) -> List[Orden]:
-        # tomo todas las ordenes
-        ordenes_models = db.query(models.Orden).options(
-            joinedload(models.Orden.ventas),
-            joinedload(models.Orden.mantenimientos)
-        ).all()
+    def lista_todos(db: Session, limit: int, cursor: Optional[str] = None) -> Tuple[List[Orden], Optional[int], Optional[str]]:
+        # tomo una pagina de ordenes, por consecutivo; el total solo en la primera
+        total = db.query(models.Orden).count() if cursor is None else None
+        query = db.query(models.Orden).options(*CARGA_RELACIONES)
+        ordenes_models, siguiente = pagina(query, None, models.Orden.consecutivo, "asc", 0, limit, cursor, "ordenes:todos")
         if not ordenes_models:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No se encontraron órdenes")
-        return [Orden.model_validate(o) for o in ordenes_models]
+        return [Orden.model_validate(o) for o in ordenes_models], total, siguiente
+
+    # todas las ordenes en NDJSON; selectinload carga las relaciones por cada tanda de yield_per
+    @staticmethod
+    def stream_todos(db: Session) -> Iterator[str]:
+        query = db.query(models.Orden).options(*CARGA_RELACIONES).order_by(models.Orden.consecutivo)
+        return escribe_ndjson(filas_esquema(query, Orden))
 
     @staticmethod
     def busca_consecutivo(db: Session, consecutivo: int) -> Orden:
-        orden = db.query(models.Orden).options(
-            joinedload(models.Orden.ventas),
-            joinedload(models.Orden.mantenimientos)
-        ).filter(models.Orden.consecutivo == consecutivo).first()
+        orden = db.query(models.Orden).options(*CARGA_RELACIONES).filter(models.Orden.consecutivo == consecutivo).first()
         
         if not orden:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Orden con consecutivo {consecutivo} NO EXISTE en la BD.")
         return Orden.model_validate(orden)
 
     @staticmethod
-    def lista_por_tipo(db: Session, tipo: Literal["solo Ventas", "solo Mantenimientos", "Mantenimiento con ventas"]) -> List[Orden]:
-        # Carga todas las ordenes con sus relaciones
-        ordenes = db.query(models.Orden).options(
-            joinedload(models.Orden.ventas),
-            joinedload(models.Orden.mantenimientos)
-        ).all()
-        
-        resultados = []
-        for orden_model in ordenes:
-            tiene_ventas = bool(orden_model.ventas)
-            tiene_mantenimientos = bool(orden_model.mantenimientos)
-            # filtro
-            if tipo == "solo Ventas" and tiene_ventas and not tiene_mantenimientos:
-                resultados.append(Orden.model_validate(orden_model))
-            elif tipo == "solo Mantenimientos" and not tiene_ventas and tiene_mantenimientos:
-                resultados.append(Orden.model_validate(orden_model))
-            elif tipo == "Mantenimiento con ventas" and tiene_ventas and tiene_mantenimientos:
-                resultados.append(Orden.model_validate(orden_model))
-        
-        if not resultados:
+    def lista_por_tipo(db: Session, tipo: Literal["solo Ventas", "solo Mantenimientos", "Mantenimiento con ventas"], offset: int, limit: int, cursor: Optional[str] = None) -> Tuple[List[Orden], Optional[int], Optional[str]]:
+        # el tipo se resuelve en la BD con EXISTS, sin cargar todas las ordenes
+        tiene_ventas = models.Orden.ventas.any()
+        tiene_mantenimientos = models.Orden.mantenimientos.any()
+        filtros = {
+            "solo Ventas": and_(tiene_ventas, ~tiene_mantenimientos),
+            "solo Mantenimientos": and_(~tiene_ventas, tiene_mantenimientos),
+            "Mantenimiento con ventas": and_(tiene_ventas, tiene_mantenimientos),
+        }
+        query = db.query(models.Orden).filter(filtros[tipo])
+        total = query.count() if cursor is None else None
+
+        ordenes_models, siguiente = pagina(query.options(*CARGA_RELACIONES), None, models.Orden.consecutivo, "asc", offset, limit, cursor, f"ordenes:tipo:{tipo}")
+
+        if not ordenes_models:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"No se encontraron órdenes del tipo: '{tipo}'")
         
-        return resultados
+        return [Orden.model_validate(o) for o in ordenes_models], total, siguiente
      
     @staticmethod
-    def lista_rango_fechas(db: Session, fecha_inicio: datetime, fecha_fin: datetime) -> List[Orden]:
+    def lista_rango_fechas(db: Session, fecha_inicio: datetime, fecha_fin: datetime, offset: int, limit: int, cursor: Optional[str] = None) -> Tuple[List[Orden], Optional[int], Optional[str]]:
         if fecha_inicio > fecha_fin:
             raise HTTPException(status_code=400, detail="La fecha de inicio no puede ser posterior a la fecha de fin")
         
-        ordenes_models = db.query(models.Orden).options(
-            joinedload(models.Orden.ventas),
-            joinedload(models.Orden.mantenimientos)
-        ).filter(
+        query = db.query(models.Orden).filter(
             models.Orden.apertura.between(fecha_inicio, fecha_fin)
-        ).all()
+        )
+        total = query.count() if cursor is None else None
+        # el rango va en la firma: un cursor no sirve para otro rango
+        firma = f"ordenes:rango:{fecha_inicio.isoformat()}:{fecha_fin.isoformat()}"
+        ordenes_models, siguiente = pagina(query.options(*CARGA_RELACIONES), None, models.Orden.consecutivo, "asc", offset, limit, cursor, firma)
         
         if not ordenes_models:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No se encontraron órdenes en ese rango de fechas")
-        return [Orden.model_validate(o) for o in ordenes_models]
+        return [Orden.model_validate(o) for o in ordenes_models], total, siguiente
     
     @staticmethod
     def lista_clientes(db: Session, cliente_id: int) -> List[Orden]:
         if not db.get(models.Cliente, cliente_id):
              raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Cliente con id {cliente_id} NO EXISTE en la BD.")
         
-        ordenes_models = db.query(models.Orden).options(
-            joinedload(models.Orden.ventas),
-            joinedload(models.Orden.mantenimientos)
-        ).filter(models.Orden.id_cliente == cliente_id).all()
+        ordenes_models = db.query(models.Orden).options(*CARGA_RELACIONES).filter(models.Orden.id_cliente == cliente_id).all()
         
         if not ordenes_models:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"No se encontraron órdenes para el cliente {cliente_id}")
@@ -120,10 +131,16 @@ class OrdenService:
             if not nuevo_cliente:
                 raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"El nuevo Cliente con id {nuevo_id_cliente} NO EXISTE en la BD. La orden no puede ser reasignada.")
 
+        # reasignar la orden puede activar o dejar inactivo a un cliente
+        clientes = {orden.id_cliente, datos_actualizacion.get("id_cliente", orden.id_cliente)}
+        antes = DashboardService.activos(db, clientes=clientes) if len(clientes) > 1 else Counter()
+
         for key, value in datos_actualizacion.items():
             setattr(orden, key, value)
 
         db.add(orden)
+        if len(clientes) > 1:
+            DashboardService.registra(db, antes, DashboardService.activos(db, clientes=clientes))
         db.commit()
         db.refresh(orden)
         
@@ -135,6 +152,9 @@ class OrdenService:
         if not db_orden:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Orden con consecutivo {consecutivo} NO EXISTE en la BD.")
         
+        # la orden se lleva en cascada sus mantenimientos y ventas
+        antes = DashboardService.aporte(db, clientes=[db_orden.id_cliente], ordenes=[consecutivo])
         db.delete(db_orden)
+        DashboardService.registra(db, antes, DashboardService.aporte(db, clientes=[db_orden.id_cliente], ordenes=[consecutivo]))
         db.commit()
         return None
\ No newline at end of file
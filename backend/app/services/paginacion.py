@@ -0,0 +1,59 @@
+import base64
+import binascii
+import json
+from typing import Any, List, Optional, Tuple
+from fastapi import HTTPException, status
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Query
+
+# el cursor es opaco para el cliente: base64 de la firma del orden y los valores de la ultima fila
+def codifica_cursor(firma: str, valores: List[Any]) -> str:
+    crudo = json.dumps({"f": firma, "v": valores}, separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(crudo.encode()).decode().rstrip("=")
+
+def decodifica_cursor(cursor: str, firma: str, n_valores: int) -> List[Any]:
+    try:
+        crudo = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        datos = json.loads(crudo)
+        valores = datos["v"]
+        valido = datos["f"] == firma and isinstance(valores, list) and len(valores) == n_valores
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        valido = False
+    if not valido:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor invalido o no corresponde al orden solicitado")
+    return valores
+
+def pagina(
+    query: Query,
+    sort_key: Any,
+    pk: Any,
+    order: str,
+    offset: int,
+    limit: int,
+    cursor: Optional[str],
+    firma: str
+) -> Tuple[List[Any], Optional[str]]:
+    # keyset sobre (sort_key, pk): la pagina N cuesta lo mismo que la primera
+    llaves = ([sort_key] if sort_key is not None else []) + [pk]
+
+    if cursor is not None:
+        valores = decodifica_cursor(cursor, firma, len(llaves))
+        despues = pk > valores[-1]
+        if sort_key is not None:
+            avanza = sort_key < valores[0] if order == "desc" else sort_key > valores[0]
+            despues = or_(avanza, and_(sort_key == valores[0], despues))
+        query = query.filter(despues)
+        offset = 0
+
+    orden = []
+    if sort_key is not None:
+        orden.append(sort_key.desc() if order == "desc" else sort_key.asc())
+
+    filas = query.add_columns(*llaves).order_by(*orden, pk).offset(offset).limit(limit + 1).all()
+
+    siguiente = None
+    if len(filas) > limit:
+        filas = filas[:limit]
+        siguiente = codifica_cursor(firma, list(filas[-1][1:]))
+
+    return [fila[0] for fila in filas], siguiente
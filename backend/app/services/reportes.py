@@ -0,0 +1,90 @@
+from fastapi import HTTPException, status
+from typing import Literal
+from sqlalchemy import String, cast, extract, func, literal, null, select, union_all
+from sqlalchemy.orm import Session
+from app.models import schemas, models
+from datetime import datetime
+
+# formato del periodo en SQLite (strftime) y el mismo con to_char en otros motores (ej. '2025-01', '2025-W03')
+FORMATOS_SQLITE = {"dia": "%Y-%m-%d", "semana": "%Y-W%W", "mes": "%Y-%m"}
+FORMATOS_TO_CHAR = {"dia": "YYYY-MM-DD", "mes": "YYYY-MM"}
+
+class ReporteService:
+
+    @staticmethod
+    def _periodo(db: Session, fecha, agrupacion: str):
+        if db.get_bind().dialect.name == "sqlite":
+            return func.strftime(FORMATOS_SQLITE[agrupacion], fecha)
+        if agrupacion in FORMATOS_TO_CHAR:
+            return func.to_char(fecha, FORMATOS_TO_CHAR[agrupacion])
+        # %W de SQLite (semanas desde el primer lunes del año, 00-53) no tiene patron en to_char (IW es la semana ISO):
+        # se calcula como (dia del año + 7 - dia de la semana ISO) / 7
+        semana = func.floor((extract("doy", fecha) + 7 - extract("isodow", fecha)) / 7)
+        return func.to_char(fecha, 'YYYY-"W"').concat(func.to_char(semana, "FM00"))
+
+    @staticmethod
+    def ventas(
+        db: Session,
+        fecha_inicio: datetime,
+        fecha_fin: datetime,
+        agrupacion: Literal["dia", "semana", "mes"],
+        top: int
+    ) -> schemas.ReporteVentas:
+        if fecha_inicio > fecha_fin:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="La fecha de inicio no puede ser posterior a la fecha de fin")
+
+        # lineas de venta del rango; las ventas sin articulos cuentan con ingreso 0
+        lineas = select(
+            models.Venta.numero,
+            models.Venta.fecha,
+            models.VentaArticulo.id_articulo,
+            models.VentaArticulo.cantidad,
+            models.VentaArticulo.precio_registrado
+        ).outerjoin(models.VentaArticulo).where(
+            models.Venta.fecha.between(fecha_inicio, fecha_fin)
+        ).cte("lineas")
+
+        ingresos = func.coalesce(func.sum(lineas.c.precio_registrado), 0)
+        periodo = ReporteService._periodo(db, lineas.c.fecha, agrupacion)
+
+        totales = select(
+            literal("total").label("tipo"), cast(null(), String).label("clave"), cast(null(), String).label("nombre"),
+            func.count(func.distinct(lineas.c.numero)).label("ventas"), null().label("cantidad"), ingresos.label("ingresos")
+        )
+        periodos = select(
+            literal("periodo"), periodo, null(),
+            func.count(func.distinct(lineas.c.numero)), null(), ingresos
+        ).group_by(periodo)
+        top_articulos = select(
+            literal("articulo").label("tipo"), cast(lineas.c.id_articulo, String).label("clave"), models.Articulo.nombre.label("nombre"),
+            null().label("ventas"), func.sum(lineas.c.cantidad).label("cantidad"), ingresos.label("ingresos")
+        ).join(models.Articulo, models.Articulo.id == lineas.c.id_articulo).group_by(
+            lineas.c.id_articulo, models.Articulo.nombre
+        ).order_by(
+            func.sum(lineas.c.cantidad).desc(), ingresos.desc(), lineas.c.id_articulo
+        ).limit(top).subquery()
+
+        # total, periodos y top de articulos en una sola consulta
+        filas = db.execute(union_all(totales, periodos, select(top_articulos))).all()
+
+        total = next(fila for fila in filas if fila.tipo == "total")
+        if not total.ventas:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No se encontraron ventas en ese rango de fechas")
+
+        return schemas.ReporteVentas(
+            fecha_inicio=fecha_inicio,
+            fecha_fin=fecha_fin,
+            agrupacion=agrupacion,
+            ventas=total.ventas,
+            ingresos=total.ingresos,
+            periodos=sorted(
+                (schemas.ReporteVentasPeriodo(periodo=f.clave, ventas=f.ventas, ingresos=f.ingresos) for f in filas if f.tipo == "periodo"),
+                key=lambda p: p.periodo
+            ),
+            # el ORDER BY de la subconsulta solo elige el top; el orden de las filas del UNION ALL no esta garantizado
+            top_articulos=sorted(
+                (schemas.ReporteArticuloTop(id_articulo=int(f.clave), nombre=f.nombre, cantidad=f.cantidad, ingresos=f.ingresos)
+                 for f in filas if f.tipo == "articulo"),
+                key=lambda a: (-a.cantidad, -a.ingresos, a.id_articulo)
+            ),
+        )
@@ -1,8 +1,12 @@
+from collections import Counter
 from fastapi import HTTPException, status
-from typing import List, Tuple, Dict
+from typing import List, Tuple, Dict, Optional, Iterator
 from sqlalchemy.orm import Session
 from app.models import schemas, models
+from app.services.bulk import escribe_ndjson, filas_esquema
 from app.services.busqueda import busca_ordena
+from app.services.dashboard import DashboardService
+from app.services.paginacion import pagina
 
 class TecnicoService:
     @staticmethod
@@ -13,16 +17,22 @@ class TecnicoService:
         
         db_tecnico = models.Tecnico(**payload.model_dump())
         db.add(db_tecnico)
+        DashboardService.registra(db, Counter(), Counter(tecnicos=1))
         db.commit()
         db.refresh(db_tecnico)
         return db_tecnico
 
     @staticmethod
-    def lista_todos(db: Session) -> List[models.Tecnico]:
-        resultados = db.query(models.Tecnico).all()
+    def lista_todos(db: Session, limit: int, cursor: Optional[str] = None) -> Tuple[List[models.Tecnico], Optional[str]]:
+        resultados, siguiente = pagina(db.query(models.Tecnico), None, models.Tecnico.id, "asc", 0, limit, cursor, "tecnicos:todos")
         if not resultados:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No se encontraron técnicos")
-        return resultados
+        return resultados, siguiente
+
+    # todos los registros en NDJSON, sin paginar ni cargar la tabla en memoria
+    @staticmethod
+    def stream_todos(db: Session) -> Iterator[str]:
+        return escribe_ndjson(filas_esquema(db.query(models.Tecnico).order_by(models.Tecnico.id), schemas.Tecnico))
 
     @staticmethod
     def busca_id(db: Session, tecnico_id: int) -> models.Tecnico:
@@ -32,27 +42,18 @@ class TecnicoService:
         return db_tecnico
 
     @staticmethod
-    def busca_tecnicos(db: Session, q: str | None, sort: str, order: str, offset: int, limit: int) -> Tuple[List[models.Tecnico], int]:
-        all_items_list = db.query(models.Tecnico).all()
-        items_dict = {item.id: schemas.Tecnico.model_validate(item) for item in all_items_list}
-        
-        resultados, total = busca_ordena(
-            items_dict=items_dict,
+    def busca_tecnicos(db: Session, q: str | None, sort: str, order: str, offset: int, limit: int, cursor: Optional[str] = None) -> Tuple[List[models.Tecnico], Optional[int], Optional[str]]:
+        return busca_ordena(
+            db=db,
+            model=models.Tecnico,
             q=q,
             search_fields=["nombre", "apellido", "especialidad"],
             sort=sort,
             order=order,
             offset=offset,
-            limit=limit
+            limit=limit,
+            cursor=cursor
         )
-
-        ids_retorno = [item.id for item in resultados]
-        modelos_retorno = db.query(models.Tecnico).filter(models.Tecnico.id.in_(ids_retorno)).all()
-        
-        model_map = {model.id: model for model in modelos_retorno}
-        modelos_ordenados = [model_map[id_val] for id_val in ids_retorno if id_val in model_map]
-        
-        return modelos_ordenados, total
        
     @staticmethod
     def lista_mantenimientos(db: Session, id_tecnico: int) -> List[models.Mantenimiento]:
@@ -106,5 +107,6 @@ class TecnicoService:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No se puede eliminar el TECNICO porque tiene MANTENIMIENTOS asignados.")
             
         db.delete(db_tecnico)
+        DashboardService.registra(db, Counter(tecnicos=1), Counter())
         db.commit()
         return None
\ No newline at end of file
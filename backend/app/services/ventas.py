@@ -1,8 +1,12 @@
+from collections import Counter
 from fastapi import HTTPException, status
-from typing import List, Tuple, Dict
+from typing import List, Tuple, Dict, Optional, Iterator
 from sqlalchemy.orm import Session
 from app.models import schemas, models
+from app.services.bulk import escribe_ndjson, filas_esquema
 from app.services.busqueda import busca_ordena
+from app.services.dashboard import DashboardService
+from app.services.paginacion import pagina
 from datetime import datetime
 
 class VentaService:
@@ -15,17 +19,23 @@ class VentaService:
         db_venta = models.Venta(**payload.model_dump())
 
         db.add(db_venta)
+        DashboardService.registra(db, Counter(), DashboardService.venta_mes(db_venta.fecha, ventas=1))
         db.commit()
         db.refresh(db_venta)
         
         return db_venta
     
     @staticmethod
-    def lista_todos(db: Session) -> List[models.Venta]:
-        resultados = db.query(models.Venta).all()
+    def lista_todos(db: Session, limit: int, cursor: Optional[str] = None) -> Tuple[List[models.Venta], Optional[str]]:
+        resultados, siguiente = pagina(db.query(models.Venta), None, models.Venta.numero, "asc", 0, limit, cursor, "ventas:todos")
         if not resultados:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No se encontraron ventas")
-        return resultados
+        return resultados, siguiente
+
+    # todos los registros en NDJSON, sin paginar ni cargar la tabla en memoria
+    @staticmethod
+    def stream_todos(db: Session) -> Iterator[str]:
+        return escribe_ndjson(filas_esquema(db.query(models.Venta).order_by(models.Venta.numero), schemas.Venta))
 
     @staticmethod
     def busca_numero(db: Session, venta_numero: int) -> models.Venta:
@@ -39,9 +49,10 @@ class VentaService:
         if fecha_inicio > fecha_fin:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="La fecha de inicio no puede ser posterior a la fecha de fin")
         
+        # el indice de fecha devuelve en orden de fecha; se mantiene el orden por numero
         resultados = db.query(models.Venta).filter(
             models.Venta.fecha.between(fecha_inicio, fecha_fin)
-        ).all()
+        ).order_by(models.Venta.numero).all()
         
         if not resultados:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No se encontraron ventas en ese rango de fechas")
@@ -49,6 +60,7 @@ class VentaService:
     
     @staticmethod
     def actualiza_venta(db: Session, venta_numero: int, venta_datos: schemas.VentaUpdate) -> models.Venta:
+        DashboardService.bloquea(db)
         db_venta = db.get(models.Venta, venta_numero)
         if not db_venta:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Venta NO encontrada")
@@ -59,6 +71,8 @@ class VentaService:
            return db_venta
 
         is_modified = False
+        # la fecha define en que mes cuenta la venta (y sus ingresos)
+        fecha_anterior = db_venta.fecha
 
         if 'consecutivo_orden' in actualizar:
             nuevo_consecutivo = actualizar['consecutivo_orden']
@@ -77,12 +91,20 @@ class VentaService:
         if not is_modified:
              return db_venta
 
+        if db_venta.fecha != fecha_anterior:
+            ingresos = DashboardService.ingresos_venta(db, venta_numero)
+            DashboardService.registra(
+                db,
+                DashboardService.venta_mes(fecha_anterior, ventas=1, ingresos=ingresos),
+                DashboardService.venta_mes(db_venta.fecha, ventas=1, ingresos=ingresos)
+            )
         db.commit()
         db.refresh(db_venta)
         return db_venta
 
     @staticmethod
     def elimina_venta(db: Session, venta_numero: int) -> None:
+        DashboardService.bloquea(db)
         db_venta = db.get(models.Venta, venta_numero)
         if not db_venta:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Venta NO encontrada en la BD")
@@ -92,6 +114,7 @@ class VentaService:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No se puede eliminar la VENTA porque tiene ARTICULOS asociados.")
         
         db.delete(db_venta)
+        DashboardService.registra(db, DashboardService.venta_mes(db_venta.fecha, ventas=1), Counter())
         db.commit()
         return None
     
@@ -100,7 +123,10 @@ class VentaService:
 
     @staticmethod
     def asigna_articulo(db: Session, payload: schemas.VentaArticuloCreate) -> models.VentaArticulo:
-        if not db.get(models.Venta, payload.numero_venta):
+        # los ingresos cuentan en el mes de la venta
+        DashboardService.bloquea(db)
+        db_venta = db.get(models.Venta, payload.numero_venta)
+        if not db_venta:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="VENTA no encontrada en BD")
         
         articulo = db.get(models.Articulo, payload.id_articulo)
@@ -124,10 +150,59 @@ class VentaService:
         )
         
         db.add(db_item)
+        DashboardService.registra(db, Counter(), DashboardService.venta_mes(db_venta.fecha, ingresos=precio_calculado))
         db.commit()
         db.refresh(db_item)
         return db_item
 
+    @staticmethod
+    def crea_venta_completa(db: Session, payload: schemas.VentaCompletaCreate) -> schemas.VentaCompleta:
+        if not db.get(models.Orden, payload.consecutivo_orden):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Orden con consecutivo: '{payload.consecutivo_orden}' no existe en la BD.")
+
+        ids = [linea.id_articulo for linea in payload.articulos]
+        if len(set(ids)) != len(ids):
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Un ARTICULO aparece mas de una vez en la venta.")
+
+        # todos los articulos en una sola consulta
+        articulos = {a.id: a for a in db.query(models.Articulo).filter(models.Articulo.id.in_(ids)).all()}
+        faltantes = [i for i in ids if i not in articulos]
+        if faltantes:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"ARTICULOS no encontrados en BD: {faltantes}")
+        sin_existencia = [i for i in ids if not articulos[i].existencia]
+        if sin_existencia:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Los articulos {sin_existencia} no tienen existencias.")
+
+        db_venta = models.Venta(fecha=payload.fecha, consecutivo_orden=payload.consecutivo_orden)
+        db.add(db_venta)
+        db.flush()
+
+        lineas = [
+            models.VentaArticulo(
+                numero_venta=db_venta.numero,
+                id_articulo=linea.id_articulo,
+                cantidad=linea.cantidad,
+                precio_registrado=articulos[linea.id_articulo].precio * linea.cantidad
+            )
+            for linea in payload.articulos
+        ]
+        db.add_all(lineas)
+        # una sola transaccion (y un solo commit) para la venta y todas sus lineas
+        DashboardService.registra(db, Counter(), DashboardService.venta_mes(
+            db_venta.fecha, ventas=1, ingresos=sum(linea.precio_registrado for linea in lineas)
+        ))
+
+        # la respuesta se arma antes del commit, que expira los objetos y obligaria a releerlos
+        venta_completa = schemas.VentaCompleta(
+            numero=db_venta.numero,
+            fecha=db_venta.fecha,
+            consecutivo_orden=db_venta.consecutivo_orden,
+            articulos=[schemas.VentaArticulo.model_validate(linea) for linea in lineas],
+            total=sum(linea.precio_registrado for linea in lineas)
+        )
+        db.commit()
+        return venta_completa
+
     @staticmethod
     def lista_articulos(db: Session, numero_venta: int) -> List[Dict]:
         if not db.get(models.Venta, numero_venta):
@@ -154,6 +229,7 @@ class VentaService:
     @staticmethod
     def actualiza_articulo(db: Session, numero_venta: int, id_articulo: int, payload: schemas.VentaArticuloUpdate) -> models.VentaArticulo:
         clave_actual = (numero_venta, id_articulo)
+        DashboardService.bloquea(db)
         db_item = db.get(models.VentaArticulo, clave_actual)
         
         if not db_item:
@@ -168,6 +244,10 @@ class VentaService:
         nuevo_id_articulo = actualizar_datos.get('id_articulo', id_articulo)
         clave_nueva = (nuevo_numero_venta, nuevo_id_articulo)
 
+        # los ingresos del mes salen de precio_registrado, en el mes de la venta
+        fecha_venta = db.get(models.Venta, numero_venta).fecha
+        antes = DashboardService.venta_mes(fecha_venta, ingresos=db_item.precio_registrado)
+
         if clave_actual == clave_nueva:
             is_modified = False
             
@@ -186,6 +266,7 @@ class VentaService:
             if not is_modified:
                 return db_item
             
+            DashboardService.registra(db, antes, DashboardService.venta_mes(fecha_venta, ingresos=db_item.precio_registrado))
             db.commit()
             db.refresh(db_item)
             return db_item
@@ -194,7 +275,8 @@ class VentaService:
             if db.get(models.VentaArticulo, clave_nueva):
                 raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="La nueva Asignacion Venta+Articulo ya existe")
 
-            if not db.get(models.Venta, nuevo_numero_venta):
+            nueva_venta = db.get(models.Venta, nuevo_numero_venta)
+            if not nueva_venta:
                 raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"La VENTA (nueva) con numero {nuevo_numero_venta} no existe")
             
             nuevo_articulo = db.get(models.Articulo, nuevo_id_articulo)
@@ -221,6 +303,7 @@ class VentaService:
             )
             db.add(db_item_nuevo)
             
+            DashboardService.registra(db, antes, DashboardService.venta_mes(nueva_venta.fecha, ingresos=nuevo_precio))
             db.commit()
             db.refresh(db_item_nuevo)
             return db_item_nuevo
@@ -228,10 +311,13 @@ class VentaService:
     @staticmethod
     def elimina_articulo(db: Session, numero_venta: int, id_articulo: int) -> None:
         clave = (numero_venta, id_articulo)
+        DashboardService.bloquea(db)
         db_item = db.get(models.VentaArticulo, clave)
         if not db_item:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Asignación Venta+Articulo no encontrada")
         
+        ingresos = DashboardService.venta_mes(db.get(models.Venta, numero_venta).fecha, ingresos=db_item.precio_registrado)
         db.delete(db_item)
+        DashboardService.registra(db, ingresos, Counter())
         db.commit()
         return None
\ No newline at end of file
@@ -0,0 +1,249 @@
+# benchmark de las rutas mas usadas, en proceso (cliente ASGI, sin red) contra una BD generada con genera_datos_db.py:
+# latencia p50/p95/p99, peticiones por segundo y consultas SQL por peticion. Guarda los resultados en JSON y
+# compara contra una linea base (sale con error si alguna ruta empeora mas que el umbral)
+# requiere httpx (pip install -e .[bench])
+# para ejecutar (desde backend/):
+#   python bench_endpoints.py --escala 1 --guarda base.json
+#   python bench_endpoints.py --escala 1 --compara base.json [--umbral 0.2]
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Tuple
+
+USUARIO, CLAVE = "bench", "bench"
+SEMILLA = 42
+
+# la misma ventana para los listados por fechas, dentro del rango que genera genera_datos_db.py
+RANGO = {"fecha_inicio": "2025-06-01T00:00:00", "fecha_fin": "2025-06-30T23:59:59"}
+
+
+def configura_entorno(url: str) -> None:
+    # el rate limiting cortaria el benchmark con 429: en memoria y con limites altos (se pueden sobreescribir)
+    os.environ["DATABASE_URL"] = url
+    os.environ.setdefault("RATE_LIMIT_STORAGE_URL", "memory://")
+    os.environ.setdefault("RATE_LIMIT_DEFAULT", "100000000/hour")
+    os.environ.setdefault("RATE_LIMIT_API_PER_MIN", "100000000/minute")
+    os.environ.setdefault("RATE_LIMIT_BURST", "100000000/second")
+    os.environ.setdefault("RATE_LIMIT_AUTH_PER_MIN", "100000000/minute")
+    os.environ.setdefault("DASHBOARD_RECONCILE_SECONDS", "0")
+
+
+# ids reales de la BD para las rutas con parametros (siempre los mismos para la misma BD)
+def parametros(db, models) -> Dict[str, List[Any]]:
+    rnd = random.Random(SEMILLA)
+    ventas = [n for (n,) in db.query(models.VentaArticulo.numero_venta).distinct().order_by(models.VentaArticulo.numero_venta)]
+    return {"ventas": sorted(rnd.sample(ventas, min(50, len(ventas))))}
+
+
+# (nombre, metodo, ruta(i) -> (url, params), repeticiones relativas); el login es lento a proposito (bcrypt)
+def casos(datos: Dict[str, List[Any]]) -> List[Tuple[str, str, Callable[[int], Tuple[str, dict]], float]]:
+    ventas = datos["ventas"] or [0]
+    return [
+        ("auth_token", "POST", lambda i: ("/auth/token", {}), 0.1),
+        ("clientes_busqueda", "GET", lambda i: ("/clientes/", {"q": "Molina", "limit": 20}), 1),
+        ("clientes_busqueda_relevancia", "GET", lambda i: ("/clientes/", {"q": "mol", "sort": "relevancia", "limit": 20}), 1),
+        ("articulos_busqueda", "GET", lambda i: ("/articulos/", {"q": "radiador", "limit": 20}), 1),
+        ("tecnicos_busqueda", "GET", lambda i: ("/tecnicos/", {"q": "Refrigeracion", "limit": 20}), 1),
+        ("mantenimientos_busqueda", "GET", lambda i: ("/mantenimientos/", {"q": "cambio", "sort": "relevancia", "limit": 20}), 1),
+        ("ordenes_tipo", "GET", lambda i: ("/ordenes/tipo/Mantenimiento con ventas", {"limit": 100}), 1),
+        ("clientes_todos", "GET", lambda i: ("/clientes/todos/", {"limit": 500}), 0.5),
+        ("clientes_todos_ordenes", "GET", lambda i: ("/clientes/todos/", {"limit": 500, "include": "ordenes"}), 0.25),
+        ("ventas_articulos", "GET", lambda i: (f"/ventas/{ventas[i % len(ventas)]}/articulos/", {}), 1),
+        ("ventas_rango", "GET", lambda i: ("/ventas/rango/fechas/", RANGO), 0.25),
+        ("mantenimientos_rango", "GET", lambda i: ("/mantenimientos/rango/fechas/", RANGO), 0.25),
+        ("ordenes_rango", "GET", lambda i: ("/ordenes/rango/fechas/", {**RANGO, "limit": 100}), 1),
+    ]
+
+
+def percentiles(tiempos: List[float]) -> Dict[str, float]:
+    if len(tiempos) < 2:
+        return {"p50": tiempos[0], "p95": tiempos[0], "p99": tiempos[0]}
+    cortes = statistics.quantiles(tiempos, n=100, method="inclusive")
+    return {"p50": cortes[49], "p95": cortes[94], "p99": cortes[98]}
+
+
+async def mide(cliente, metodo: str, ruta: Callable[[int], Tuple[str, dict]], repeticiones: int, calentamiento: int,
+               concurrencia: int, headers: dict, contador: List[int]) -> Dict[str, Any]:
+    async def peticion(i: int) -> Tuple[float, int]:
+        url, params = ruta(i)
+        inicio = time.perf_counter()
+        if metodo == "POST":
+            respuesta = await cliente.post(url, data={"username": USUARIO, "password": CLAVE})
+        else:
+            respuesta = await cliente.get(url, params=params, headers=headers)
+        return time.perf_counter() - inicio, respuesta.status_code
+
+    for i in range(calentamiento):
+        await peticion(i)
+
+    tiempos: List[float] = []
+    errores: Dict[int, int] = {}
+    siguiente = iter(range(repeticiones))
+
+    async def trabajador() -> None:
+        for i in siguiente:
+            segundos, estado = await peticion(i)
+            tiempos.append(segundos * 1000)
+            if estado >= 400:
+                errores[estado] = errores.get(estado, 0) + 1
+
+    consultas_antes = contador[0]
+    inicio = time.perf_counter()
+    await asyncio.gather(*(trabajador() for _ in range(concurrencia)))
+    total = time.perf_counter() - inicio
+    return {
+        "peticiones": repeticiones,
+        **{k: round(v, 3) for k, v in percentiles(tiempos).items()},
+        "por_segundo": round(repeticiones / total, 1),
+        "consultas_por_peticion": round((contador[0] - consultas_antes) / repeticiones, 2),
+        "errores": errores,
+    }
+
+
+async def ejecuta_benchmark(args, contador: List[int]) -> Dict[str, Any]:
+    import httpx
+    from app.main import app
+    from app.db.session import SessionLocal
+    from app.models import models
+
+    db = SessionLocal()
+    try:
+        datos = parametros(db, models)
+    finally:
+        db.close()
+
+    resultados: Dict[str, Any] = {}
+    transporte = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transporte, base_url="http://bench") as cliente:
+            respuesta = await cliente.post("/auth/token", data={"username": USUARIO, "password": CLAVE})
+            respuesta.raise_for_status()
+            headers = {"Authorization": f"Bearer {respuesta.json()['access_token']}"}
+
+            print(f"{'ruta':<30} {'n':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'pet/s':>9} {'SQL/pet':>8}")
+            for nombre, metodo, ruta, peso in casos(datos):
+                if args.solo and nombre not in args.solo:
+                    continue
+                repeticiones = max(5, int(args.repeticiones * peso))
+                resultado = await mide(cliente, metodo, ruta, repeticiones, args.calentamiento, args.concurrencia, headers, contador)
+                resultados[nombre] = resultado
+                print(f"{nombre:<30} {repeticiones:>5} {resultado['p50']:>9.2f} {resultado['p95']:>9.2f} {resultado['p99']:>9.2f} "
+                      f"{resultado['por_segundo']:>9.1f} {resultado['consultas_por_peticion']:>8.2f}"
+                      + (f"  errores: {resultado['errores']}" if resultado["errores"] else ""))
+    return resultados
+
+
+# prepara la BD: migra y, si esta vacia, la llena con genera_datos_db.py; el usuario del benchmark se crea si falta
+def prepara_bd(escala: float) -> Dict[str, int]:
+    from sqlalchemy import func, inspect
+    from app.db.session import SessionLocal, engine, Base
+    from app.db.migraciones import migra
+    from app.services.auth import AuthService
+    from app.services.dashboard import DashboardService
+    from carga_casos_db import TABLAS_INTERNAS, check_if_data_exists
+    from genera_datos_db import carga
+
+    migra(engine)
+    db = SessionLocal()
+    try:
+        if not check_if_data_exists(db, inspect(engine)):
+            print(f"BD vacia: generando datos (escala {escala:g}, semilla {SEMILLA})...")
+            carga(db, escala, SEMILLA, 5000)
+            DashboardService.reconcilia(db)
+        if not AuthService.alista_nombre(db, USUARIO):
+            AuthService.guarda_usuario(db, USUARIO, AuthService.alista_hash(CLAVE))
+        return {
+            nombre: db.query(func.count()).select_from(tabla).scalar()
+            for nombre, tabla in Base.metadata.tables.items() if nombre not in TABLAS_INTERNAS | {"users"}
+        }
+    finally:
+        db.close()
+
+
+# una ruta empeora si su p50 o p95 sube mas que el umbral o si hace mas consultas por peticion
+def compara(base: Dict[str, Any], actual: Dict[str, Any], umbral: float) -> bool:
+    if base.get("filas") != actual.get("filas"):
+        print("Aviso: la linea base se midio con otra cantidad de datos; los tiempos no son comparables")
+    hay_regresion = False
+    print(f"\n{'ruta':<30} {'p50 base':>9} {'p50':>9} {'p95 base':>9} {'p95':>9} {'SQL base':>9} {'SQL':>6}")
+    for nombre, resultado in actual["resultados"].items():
+        anterior = base["resultados"].get(nombre)
+        if anterior is None:
+            print(f"{nombre:<30} (sin linea base)")
+            continue
+        motivos = [
+            f"{p} +{(resultado[p] / anterior[p] - 1) * 100:.0f}%"
+            for p in ("p50", "p95") if anterior[p] > 0 and resultado[p] > anterior[p] * (1 + umbral)
+        ]
+        if resultado["consultas_por_peticion"] > anterior["consultas_por_peticion"]:
+            motivos.append(f"consultas {anterior['consultas_por_peticion']:g} -> {resultado['consultas_por_peticion']:g}")
+        hay_regresion = hay_regresion or bool(motivos)
+        print(f"{nombre:<30} {anterior['p50']:>9.2f} {resultado['p50']:>9.2f} {anterior['p95']:>9.2f} {resultado['p95']:>9.2f} "
+              f"{anterior['consultas_por_peticion']:>9.2f} {resultado['consultas_por_peticion']:>6.2f}"
+              + (f"  REGRESION: {', '.join(motivos)}" if motivos else ""))
+    return hay_regresion
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de las rutas principales de la API")
+    parser.add_argument("--url", default="sqlite:///./benchmark.db", help="BD del benchmark (se llena si esta vacia)")
+    parser.add_argument("--escala", type=float, default=1.0, help="Escala de genera_datos_db.py si hay que llenar la BD")
+    parser.add_argument("--repeticiones", type=int, default=200, help="Peticiones por ruta (el login y los listados grandes usan menos)")
+    parser.add_argument("--calentamiento", type=int, default=5, help="Peticiones por ruta que no se miden")
+    parser.add_argument("--concurrencia", type=int, default=1, help="Peticiones simultaneas")
+    parser.add_argument("--solo", type=lambda s: set(s.split(",")), help="Rutas a medir, separadas por coma")
+    parser.add_argument("--guarda", help="Guarda los resultados en este JSON (linea base)")
+    parser.add_argument("--compara", help="Linea base JSON contra la que se compara")
+    parser.add_argument("--umbral", type=float, default=0.2, help="Aumento de p50/p95 tolerado al comparar (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    configura_entorno(args.url)
+    try:
+        import httpx  # noqa: F401
+        filas = prepara_bd(args.escala)
+    except ImportError as e:
+        print(f"Error: No se pudieron importar los módulos ({e}).")
+        print("Este script se debe ejecutar en la ruta 'ApiWeb/backend/' y requiere httpx (pip install -e .[bench]).")
+        sys.exit(1)
+
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+    contador = [0]
+    def cuenta(conn, cursor, statement, parameters, context, executemany):
+        contador[0] += 1
+    event.listen(Engine, "before_cursor_execute", cuenta)
+
+    print(f"BD: {args.url} ({sum(filas.values())} filas), concurrencia {args.concurrencia}")
+    resultados = asyncio.run(ejecuta_benchmark(args, contador))
+    actual = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "url": args.url,
+        "filas": filas,
+        "concurrencia": args.concurrencia,
+        "resultados": resultados,
+    }
+
+    if args.guarda:
+        with open(args.guarda, "w", encoding="utf-8") as archivo:
+            json.dump(actual, archivo, indent=2)
+        print(f"\nResultados guardados en {args.guarda}")
+    if args.compara:
+        with open(args.compara, encoding="utf-8") as archivo:
+            base = json.load(archivo)
+        if compara(base, actual, args.umbral):
+            print(f"\nHay rutas que empeoraron mas del {args.umbral:.0%}.")
+            sys.exit(1)
+        print("\nSin regresiones.")
+
+
+if __name__ == "__main__":
+    main()
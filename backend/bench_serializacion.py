@@ -0,0 +1,90 @@
+# mide el costo de CPU de validar y serializar las respuestas de los listados
+# para ejecutar (desde backend/, con la BD ya cargada): python bench_serializacion.py [filas] [repeticiones]
+
+import sys
+import time
+from typing import List, Optional
+
+try:
+    from pydantic import EmailStr, TypeAdapter
+    from app.db.session import SessionLocal
+    from app.models import models, schemas
+    from app.services.clientes import CARGA_ORDENES
+    from app.services.ordenes import CARGA_RELACIONES
+except ImportError:
+    print("Error: No se pudieron importar los módulos de la app.")
+    print("Este script se debe ejecutar en la ruta 'ApiWeb/backend/'.")
+    sys.exit(1)
+
+
+# salida de clientes como estaba antes: correo revalidado como EmailStr en cada respuesta
+class ClienteResumenEmail(schemas.ClienteResumen):
+    correo: Optional[EmailStr] = None
+
+class ClienteEmail(schemas.Cliente):
+    correo: Optional[EmailStr] = None
+
+
+def cpu_ms(fn, repeticiones: int) -> float:
+    fn()
+    inicio = time.process_time()
+    for _ in range(repeticiones):
+        fn()
+    return (time.process_time() - inicio) / repeticiones * 1000
+
+
+def compara(nombre: str, antes, despues, repeticiones: int) -> None:
+    t_antes = cpu_ms(antes, repeticiones)
+    t_despues = cpu_ms(despues, repeticiones)
+    print(f"{nombre:<50} {t_antes:9.2f} ms {t_despues:9.2f} ms {t_antes - t_despues:9.2f} ms")
+
+
+def main():
+    filas = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    repeticiones = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    db = SessionLocal()
+    try:
+        clientes = db.query(models.Cliente).options(*CARGA_ORDENES).order_by(models.Cliente.id).limit(filas).all()
+        ordenes = db.query(models.Orden).options(*CARGA_RELACIONES).order_by(models.Orden.consecutivo).limit(filas).all()
+    finally:
+        db.close()
+
+    print(f"CPU por peticion ({len(clientes)} clientes, {len(ordenes)} ordenes, {repeticiones} repeticiones)")
+    print(f"{'':<50} {'antes':>12} {'ahora':>12} {'ahorro':>12}")
+
+    # clientes: antes el servicio validaba (con EmailStr) y FastAPI volvia a validar contra la Union
+    union = TypeAdapter(List[ClienteEmail] | List[ClienteResumenEmail])
+    resumen = TypeAdapter(List[schemas.ClienteResumen])
+    completo = TypeAdapter(List[schemas.Cliente])
+
+    def clientes_antes(esquema):
+        datos = [esquema.model_validate(c) for c in clientes]
+        return union.dump_json(union.validate_python(datos))
+
+    compara(
+        "/clientes/todos/",
+        lambda: clientes_antes(ClienteResumenEmail),
+        lambda: resumen.dump_json([schemas.ClienteResumen.model_validate(c) for c in clientes]),
+        repeticiones,
+    )
+    compara(
+        "/clientes/todos/?include=ordenes",
+        lambda: clientes_antes(ClienteEmail),
+        lambda: completo.dump_json([schemas.Cliente.model_validate(c) for c in clientes]),
+        repeticiones,
+    )
+
+    # referencia: con un response_model de tipo unico FastAPI acepta las instancias ya validadas
+    # casi sin costo, asi que esas rutas ya validaban una sola vez
+    lista_ordenes = TypeAdapter(List[schemas.Orden])
+    compara(
+        "/ordenes/todos/ (response_model sobre instancias)",
+        lambda: lista_ordenes.dump_json(lista_ordenes.validate_python([schemas.Orden.model_validate(o) for o in ordenes])),
+        lambda: lista_ordenes.dump_json([schemas.Orden.model_validate(o) for o in ordenes]),
+        repeticiones,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,7 @@ from sqlalchemy import inspect, select
 
 try:
     from app.db.session import SessionLocal, engine, Base
+    from app.db.migraciones import migra
     from app.models import models
 except ImportError:
     print("Error: No se pudieron importar los módulos de la app.")
@@ -87,11 +88,14 @@ def populate_db_data(db: Session):
         db.rollback()
         raise
 
+# tablas que mantiene la app (version del esquema, contadores), no son datos cargados
+TABLAS_INTERNAS = {"esquema_version", "metricas", "versiones"}
+
 def check_if_data_exists(db: Session, inspector) -> bool:
     existing_tables = inspector.get_table_names()
     
     for table_name, table_model in Base.metadata.tables.items():
-        if table_name in existing_tables:
+        if table_name in existing_tables and table_name not in TABLAS_INTERNAS:
             try:
                 first_row = db.execute(select(table_model).limit(1)).first()
                 if first_row:
@@ -109,7 +113,7 @@ def main():
     inspector = inspect(engine)
     
     try:
-        Base.metadata.create_all(bind=engine)
+        migra(engine)
         
         data_exists = check_if_data_exists(db, inspector)
 
@@ -120,7 +124,7 @@ def main():
             if respuesta in ['s', 'si', 'yes']:
                 print("Borrando todos los registros actuales...")
                 Base.metadata.drop_all(bind=engine)
-                Base.metadata.create_all(bind=engine)
+                migra(engine)
                 print("Registros borrados. Cargando nuevos casos de prueba...")
                 
                 populate_db_data(db)
@@ -0,0 +1,246 @@
+# genera datos sinteticos a escala para pruebas de rendimiento (carga_casos_db.py solo trae unos pocos casos)
+# mismo --escala y --semilla dan siempre los mismos datos. Escala 1 ~ 210 mil filas, escala 10 ~ 2.1 millones
+# para ejecutar (desde backend/): python genera_datos_db.py [--escala N] [--semilla S] [--reemplaza] [--usuario U --clave C]
+
+import argparse
+import itertools
+import math
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List
+
+try:
+    from sqlalchemy import inspect, insert
+    from sqlalchemy.orm import Session
+    from app.db.session import SessionLocal, engine, Base
+    from app.db.migraciones import migra
+    from app.models import models
+    from app.services.auth import AuthService
+    from app.services.dashboard import DashboardService
+    from carga_casos_db import check_if_data_exists
+except ImportError:
+    print("Error: No se pudieron importar los módulos de la app.")
+    print("Este script se debe ejecutar en la ruta 'ApiWeb/backend/'.")
+    sys.exit(1)
+
+
+# filas por unidad de escala; los mantenimientos, ventas y sus relaciones salen de las ordenes
+CLIENTES = 10_000
+ORDENES = 40_000
+ARTICULOS = 2_500
+TECNICOS = 60
+
+DESDE = datetime(2024, 1, 1)
+HASTA = datetime(2025, 12, 31)
+
+NOMBRES = ["Juan", "Diana", "Adam", "Andres", "Maria", "Camila", "Carlos", "Luisa", "Jorge", "Paula", "Sofia", "Miguel",
+           "Valentina", "Santiago", "Daniela", "Felipe", "Laura", "Sebastian", "Natalia", "Ivan", "Angela", "Oscar", "Eider", "Julian"]
+APELLIDOS = ["Duran", "Valentina", "Santana", "Guzman", "Molina", "Jaimes", "Diaz", "Perez", "Gomez", "Rodriguez", "Martinez",
+             "Lopez", "Garcia", "Hernandez", "Ramirez", "Torres", "Rojas", "Vargas", "Castro", "Ortiz", "Moreno", "Suarez"]
+ESPECIALIDADES = ["Refrigeracion", "Electrico", "Sensores", "Programacion", "Mecanica", "Electronica", "Hidraulica"]
+CALLES = ["Av Caracas", "Av Quito", "Calle", "Carrera", "Diagonal", "Transversal", "Av Boyaca"]
+DOMINIOS = ["mail.com", "correo.com", "empresa.co", "web.net"]
+PRODUCTOS = ["Splitter", "Fusible", "Aspas AC", "Jumper", "Radiador", "Compresor", "Condensador", "Termostato", "Relay",
+             "Sensor", "Ventilador", "Filtro", "Capacitor", "Tarjeta", "Cable", "Bujia", "Correa", "Motor", "Valvula", "Breaker"]
+MEDIDAS = ["3 inch", "5A", "10A", "24 inch", "16 AWG", "12V", "110V", "220V", "1/2 HP", "1 HP", "R2U2", "XL", "M-M"]
+DETALLES = ["usado", "nuevo", "original", "generico", "reparado", None]
+TRABAJOS = ["Cambio aceite", "Pintura", "Alineacion", "Cambio bujia", "Reparacion cableado", "Limpieza general",
+            "Cambio de filtro", "Recarga de gas", "Revision electrica", "Ajuste de sensores", "Cambio de compresor",
+            "Calibracion", "Actualizacion de firmware", "Cambio de correa", "Diagnostico"]
+
+
+# pesos acumulados tipo Zipf: pocos clientes/articulos/tecnicos concentran la mayoria de los registros
+def pesos_zipf(n: int, s: float) -> List[float]:
+    return list(itertools.accumulate(1 / (i + 1) ** s for i in range(n)))
+
+
+# aperturas ordenadas (el consecutivo crece con la fecha), en horario laboral, con mas movimiento hacia el final
+def fechas_ordenadas(rnd: random.Random, n: int) -> Iterator[datetime]:
+    dias = (HASTA - DESDE).days
+    for u in sorted(rnd.random() for _ in range(n)):
+        dia = DESDE + timedelta(days=int(math.sqrt(u) * dias))
+        yield dia.replace(hour=rnd.randint(8, 17), minute=rnd.randrange(0, 60, 5))
+
+
+class Generador:
+
+    def __init__(self, escala: float, semilla: int):
+        self.rnd = random.Random(semilla)
+        self.escala = escala
+        self.clientes: List[int] = []
+        self.articulos: List[tuple] = []
+        self.tecnicos: List[int] = []
+
+    def cantidad(self, base: int) -> int:
+        return max(1, round(base * self.escala))
+
+    def genera_clientes(self) -> Iterator[dict]:
+        rnd = self.rnd
+        n = self.cantidad(CLIENTES)
+        self.clientes = rnd.sample(range(10_000_000, 99_999_999), n)
+        for i, id_cliente in enumerate(self.clientes):
+            nombre, apellido = rnd.choice(NOMBRES), rnd.choice(APELLIDOS)
+            yield {
+                "id": id_cliente, "nombre": nombre, "apellido": apellido,
+                # el correo es unico: lleva el indice del cliente
+                "correo": f"{nombre[:2].lower()}{apellido[:2].lower()}{i}@{rnd.choice(DOMINIOS)}" if rnd.random() < 0.8 else None,
+                "contacto": 3000000000 + rnd.randrange(0, 999999999) if rnd.random() < 0.7 else None,
+                "direccion": f"{rnd.choice(CALLES)} #{rnd.randint(1, 200)}-{rnd.randint(1, 99)}" if rnd.random() < 0.6 else None,
+            }
+
+    def genera_tecnicos(self) -> Iterator[dict]:
+        rnd = self.rnd
+        self.tecnicos = rnd.sample(range(100_000, 999_999), self.cantidad(TECNICOS))
+        for id_tecnico in self.tecnicos:
+            yield {"id": id_tecnico, "nombre": rnd.choice(NOMBRES), "apellido": rnd.choice(APELLIDOS),
+                   "especialidad": rnd.choice(ESPECIALIDADES)}
+
+    def genera_articulos(self) -> Iterator[dict]:
+        rnd = self.rnd
+        n = self.cantidad(ARTICULOS)
+        for id_articulo in rnd.sample(range(1, n * 10), n):
+            # precios lognormales alrededor de 30 mil, redondeados a cientos
+            precio = float(max(500, round(rnd.lognormvariate(10.3, 1.0), -2)))
+            self.articulos.append((id_articulo, precio))
+            detalle = rnd.choice(DETALLES)
+            yield {"id": id_articulo, "nombre": f"{rnd.choice(PRODUCTOS)} {rnd.choice(MEDIDAS)}",
+                   "descripcion": detalle, "precio": precio, "existencia": rnd.random() < 0.85}
+
+    # cada orden con sus mantenimientos (y tecnicos) y ventas (y articulos); devuelve (tabla, fila)
+    def genera_ordenes(self) -> Iterator[tuple]:
+        rnd = self.rnd
+        n = self.cantidad(ORDENES)
+        # ~20% de los clientes nunca tiene ordenes; del resto unos pocos concentran muchas
+        activos = self.clientes[:max(1, int(len(self.clientes) * 0.8))]
+        pesos_clientes = pesos_zipf(len(activos), 0.7)
+        pesos_articulos = pesos_zipf(len(self.articulos), 1.0)
+        pesos_tecnicos = pesos_zipf(len(self.tecnicos), 0.5)
+        numero_mto = numero_venta = 0
+        # las ordenes del final (las mas recientes) son las que siguen abiertas
+        abiertas_desde = int(n * 0.97)
+
+        for consecutivo, apertura in enumerate(fechas_ordenadas(rnd, n), start=1):
+            yield "ordenes", {"consecutivo": consecutivo, "apertura": apertura,
+                              "id_cliente": rnd.choices(activos, cum_weights=pesos_clientes)[0]}
+            # 35% solo mantenimiento, 30% solo ventas, 25% ambos, 10% vacias
+            clase = rnd.random()
+            con_mto, con_venta = clase < 0.60, 0.35 <= clase < 0.90
+
+            if con_mto:
+                for _ in range(rnd.choices((1, 2, 3), weights=(80, 15, 5))[0]):
+                    numero_mto += 1
+                    inicio = apertura + timedelta(minutes=rnd.randint(0, 240))
+                    abierto = consecutivo >= abiertas_desde or rnd.random() < 0.02
+                    yield "mantenimientos", {
+                        "numero": numero_mto, "tipo": "Correctivo" if rnd.random() < 0.7 else "Preventivo",
+                        "descripcion": rnd.choice(TRABAJOS), "apertura": inicio,
+                        "cierre": None if abierto else inicio + timedelta(hours=rnd.expovariate(1 / 30)),
+                        "precio": float(round(rnd.lognormvariate(12.0, 0.7), -3)), "consecutivo_orden": consecutivo,
+                    }
+                    cantidad_tecnicos = rnd.choices((1, 2, 3), weights=(70, 25, 5))[0]
+                    for id_tecnico in {rnd.choices(self.tecnicos, cum_weights=pesos_tecnicos)[0] for _ in range(cantidad_tecnicos)}:
+                        yield "mto_tecnicos", {"numero_mantenimiento": numero_mto, "id_tecnico": id_tecnico}
+
+            if con_venta:
+                for _ in range(rnd.choices((1, 2, 3), weights=(75, 20, 5))[0]):
+                    numero_venta += 1
+                    yield "ventas", {"numero": numero_venta, "fecha": apertura + timedelta(minutes=rnd.randint(10, 600)),
+                                     "consecutivo_orden": consecutivo}
+                    lineas = rnd.choices((1, 2, 3, 4, 5), weights=(40, 25, 15, 12, 8))[0]
+                    for id_articulo, precio in {rnd.choices(self.articulos, cum_weights=pesos_articulos)[0] for _ in range(lineas)}:
+                        cantidad = rnd.choices((1, 2, 3, 4, 5), weights=(60, 20, 10, 5, 5))[0]
+                        yield "venta_articulos", {"numero_venta": numero_venta, "id_articulo": id_articulo,
+                                                  "cantidad": cantidad, "precio_registrado": precio * cantidad}
+
+
+# inserta por lotes con insert() de Core (executemany), sin armar objetos del ORM.
+# Pasa por la sesion para que los commits suban las versiones de las tablas (ETags y cache)
+class Cargador:
+
+    def __init__(self, db: Session, lote: int):
+        self.db = db
+        self.lote = lote
+        self.pendientes: Dict[str, List[dict]] = {}
+        self.cargadas: Dict[str, int] = {}
+        # orden de dependencias (FK): las ordenes antes que sus ventas y mantenimientos
+        self._orden = [tabla.name for tabla in Base.metadata.sorted_tables]
+
+    def agrega(self, tabla: str, fila: dict) -> None:
+        filas = self.pendientes.setdefault(tabla, [])
+        filas.append(fila)
+        if len(filas) >= self.lote:
+            self.vacia()
+
+    def vacia(self) -> None:
+        for nombre in self._orden:
+            filas = self.pendientes.pop(nombre, None)
+            if filas:
+                self.db.execute(insert(Base.metadata.tables[nombre]), filas)
+                self.cargadas[nombre] = self.cargadas.get(nombre, 0) + len(filas)
+        self.db.commit()
+
+
+def carga(db: Session, escala: float, semilla: int, lote: int) -> Dict[str, int]:
+    generador = Generador(escala, semilla)
+    cargador = Cargador(db, lote)
+    etapas = [
+        ("clientes", lambda: (("clientes", f) for f in generador.genera_clientes())),
+        ("tecnicos", lambda: (("tecnicos", f) for f in generador.genera_tecnicos())),
+        ("articulos", lambda: (("articulos", f) for f in generador.genera_articulos())),
+        ("ordenes", generador.genera_ordenes),
+    ]
+    for nombre, filas in etapas:
+        inicio = time.perf_counter()
+        antes = sum(cargador.cargadas.values())
+        for tabla, fila in filas():
+            cargador.agrega(tabla, fila)
+        cargador.vacia()
+        total = sum(cargador.cargadas.values()) - antes
+        segundos = time.perf_counter() - inicio
+        print(f"  {nombre:<10} {total:>10} filas en {segundos:7.1f} s ({total / max(segundos, 1e-9):,.0f} filas/s)")
+    return cargador.cargadas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera datos sinteticos a escala en la BD")
+    parser.add_argument("--escala", type=float, default=1.0, help="Multiplicador de filas (1 ~ 210 mil filas)")
+    parser.add_argument("--semilla", type=int, default=42, help="Semilla del generador; la misma semilla da los mismos datos")
+    parser.add_argument("--lote", type=int, default=5000, help="Filas por insert")
+    parser.add_argument("--reemplaza", action="store_true", help="Borra todas las tablas si la BD ya tiene datos (sin preguntar)")
+    parser.add_argument("--usuario", help="Crea este usuario para autenticar las pruebas")
+    parser.add_argument("--clave", help="Clave del usuario de --usuario")
+    args = parser.parse_args()
+    if bool(args.usuario) != bool(args.clave):
+        parser.error("--usuario y --clave van juntos")
+
+    migra(engine)
+    db: Session = SessionLocal()
+    try:
+        if check_if_data_exists(db, inspect(engine)):
+            if not args.reemplaza:
+                print("La base de datos ya tiene datos. Use --reemplaza para borrarla y generar de nuevo.")
+                sys.exit(1)
+            print("Borrando todos los registros actuales...")
+            db.close()
+            Base.metadata.drop_all(bind=engine)
+            migra(engine)
+
+        print(f"Generando datos (escala {args.escala:g}, semilla {args.semilla})...")
+        inicio = time.perf_counter()
+        cargadas = carga(db, args.escala, args.semilla, args.lote)
+
+        if args.usuario:
+            AuthService.guarda_usuario(db, args.usuario, AuthService.alista_hash(args.clave))
+
+        # los contadores del dashboard se arman desde las tablas recien cargadas
+        DashboardService.reconcilia(db)
+        total = sum(cargadas.values())
+        print(f"{total} filas en {time.perf_counter() - inicio:.1f} s: " + ", ".join(f"{t}={n}" for t, n in cargadas.items()))
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# verifica con EXPLAIN QUERY PLAN que las consultas de los servicios usan los indices (sale con error si alguna no)
+# los indices los crean las migraciones: python migra_db.py
+# para ejecutar (desde backend/): python indices_db.py
+
+import sys
+from datetime import datetime
+from fastapi import HTTPException
+from sqlalchemy import event, func
+
+try:
+    from app.db.session import SessionLocal, engine
+    from app.db.indices import plan_consulta
+    from app.models import models
+    from app.services.articulos import ArticuloService
+    from app.services.mantenimientos import MantenimientoService
+    from app.services.ordenes import OrdenService
+    from app.services.reportes import ReporteService
+    from app.services.tecnicos import TecnicoService
+    from app.services.ventas import VentaService
+except ImportError:
+    print("Error: No se pudieron importar los módulos de la app.")
+    print("Este script se debe ejecutar en la ruta 'ApiWeb/backend/'.")
+    sys.exit(1)
+
+
+INICIO, FIN = datetime(2025, 1, 1), datetime(2025, 12, 31)
+
+# (consulta del servicio, indices que su plan debe usar)
+def casos(db):
+    # ids que existen, para que el servicio llegue a la consulta y no corte antes con 404
+    articulo = db.query(func.min(models.VentaArticulo.id_articulo)).scalar() or db.query(func.min(models.Articulo.id)).scalar() or 0
+    tecnico = db.query(func.min(models.MtoTecnico.id_tecnico)).scalar() or db.query(func.min(models.Tecnico.id)).scalar() or 0
+    cliente = db.query(func.min(models.Orden.id_cliente)).scalar() or 0
+    orden = db.query(func.min(models.Mantenimiento.consecutivo_orden)).scalar() or 0
+    return [
+        ("VentaService.lista_rango_fechas", lambda: VentaService.lista_rango_fechas(db, INICIO, FIN), ["ix_ventas_fecha"]),
+        ("MantenimientoService.lista_rango_fechas", lambda: MantenimientoService.lista_rango_fechas(db, INICIO, FIN),
+         ["ix_mantenimientos_apertura", "ix_mantenimientos_cierre"]),
+        ("MantenimientoService.lista_por_tipo", lambda: MantenimientoService.lista_por_tipo(db, "Correctivo"), ["ix_mantenimientos_tipo"]),
+        ("MantenimientoService.lista_orden", lambda: MantenimientoService.lista_orden(db, orden), ["ix_mantenimientos_orden_cierre"]),
+        ("OrdenService.lista_rango_fechas", lambda: OrdenService.lista_rango_fechas(db, INICIO, FIN, 0, 10), ["ix_ordenes_apertura"]),
+        ("OrdenService.lista_clientes", lambda: OrdenService.lista_clientes(db, cliente),
+         ["ix_ordenes_id_cliente", "ix_ventas_consecutivo_orden", "ix_mantenimientos_orden_cierre"]),
+        ("OrdenService.lista_por_tipo", lambda: OrdenService.lista_por_tipo(db, "Mantenimiento con ventas", 0, 10),
+         ["ix_ventas_consecutivo_orden", "ix_mantenimientos_orden_cierre"]),
+        ("ArticuloService.lista_por_existencia", lambda: ArticuloService.lista_por_existencia(db, "no disponible"), ["ix_articulos_existencia"]),
+        ("ArticuloService.lista_ventas", lambda: ArticuloService.lista_ventas(db, articulo), ["ix_venta_articulos_articulo_venta"]),
+        ("TecnicoService.lista_mantenimientos", lambda: TecnicoService.lista_mantenimientos(db, tecnico), ["ix_mto_tecnicos_tecnico_mantenimiento"]),
+        ("ReporteService.ventas", lambda: ReporteService.ventas(db, INICIO, FIN, "mes", 10), ["ix_ventas_fecha"]),
+    ]
+
+
+def verifica() -> bool:
+    sentencias = []
+    def captura(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            sentencias.append((statement, parameters))
+
+    todo_bien = True
+    db = SessionLocal()
+    try:
+        for nombre, consulta, esperados in casos(db):
+            sentencias.clear()
+            sin_datos = False
+            event.listen(engine, "before_cursor_execute", captura)
+            try:
+                consulta()
+            except HTTPException:
+                sin_datos = True
+            finally:
+                event.remove(engine, "before_cursor_execute", captura)
+
+            connection = db.connection()
+            planes = [linea for sentencia, parametros in sentencias for linea in plan_consulta(connection, sentencia, parametros)]
+            faltan = [indice for indice in esperados if not any(f"INDEX {indice} " in f"{linea} " for linea in planes)]
+            if faltan and sin_datos:
+                # el servicio respondio 404 antes de la consulta (ej. tabla vacia): no hay plan que revisar
+                print(f"--    {nombre} (sin datos para probar)")
+                continue
+            todo_bien = todo_bien and not faltan
+            print(f"{'OK   ' if not faltan else 'FALLA'} {nombre}" + (f" (no usa: {', '.join(faltan)})" if faltan else ""))
+            if faltan:
+                for linea in planes:
+                    print(f"        {linea}")
+    finally:
+        db.close()
+    return todo_bien
+
+
+if __name__ == "__main__":
+    sys.exit(0 if verifica() else 1)
@@ -0,0 +1,38 @@
+# aplica las migraciones pendientes del esquema (app/db/migraciones.py); correrlo antes de desplegar
+# para que los workers arranquen sin migrar (ver DB_AUTO_MIGRATE)
+# para ejecutar (desde backend/): python migra_db.py [--estado] [--hasta N]
+
+import argparse
+import sys
+
+try:
+    from app.db.session import engine
+    from app.db.migraciones import MIGRACIONES, VERSION_ESQUEMA, migra, version_esquema
+except ImportError:
+    print("Error: No se pudieron importar los módulos de la app.")
+    print("Este script se debe ejecutar en la ruta 'ApiWeb/backend/'.")
+    sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migraciones del esquema de la BD")
+    parser.add_argument("--estado", action="store_true", help="Solo muestra la version actual y las pendientes")
+    parser.add_argument("--hasta", type=int, default=VERSION_ESQUEMA, help="Version a la que se migra (por defecto la ultima)")
+    args = parser.parse_args()
+
+    actual = version_esquema(engine)
+    print(f"Version del esquema: {actual} (la app usa la {VERSION_ESQUEMA})")
+    pendientes = [(numero, descripcion) for numero, descripcion, _ in MIGRACIONES if actual < numero <= args.hasta]
+    for numero, descripcion in pendientes:
+        print(f"  pendiente {numero}: {descripcion}")
+    if args.estado or not pendientes:
+        if not pendientes:
+            print("Nada que migrar.")
+        return
+
+    aplicadas = migra(engine, args.hasta)
+    print(f"Migraciones aplicadas: {', '.join(map(str, aplicadas)) if aplicadas else 'ninguna (otro proceso ya las aplico)'}")
+
+
+if __name__ == "__main__":
+    main()